@@ -0,0 +1,193 @@
+# 로그 조회 경로 벤치마크 (네트워크 없이 합성 일지 + 가짜 gspread 사용)
+#
+#   python -m benchmarks.bench_log --sizes 1000 10000 100000 --output bench.jsonl
+#
+# 크기마다 다음 단계를 측정하고, 측정값 하나당 JSON 한 줄을 출력합니다.
+#   load_data.*   : 로컬 사본 동기화 (처음 전체 / 새 행 증분 / 변경 없음)
+#   sharded.*     : 월별 탭으로 나눈 같은 일지의 동기화 (처음 전체 동시 읽기 / 현재 탭만 확인)
+#   preprocess.*  : (D) 스키마 변환 (원본 문자열 -> 자료형)
+#   options.*     : (E) 필터 선택지 / 범위 조회 (options.cached 는 같은 데이터 버전에서 다시 부를 때)
+#   filter.*      : (F) 필터별 조회와 전체 필터 조합
+#   table.*       : (G) 필터 결과 건수, 정렬된 한 페이지 조회, 전체 CSV 내보내기
+#                   (*_cached 는 필터 결과 캐시에 있을 때, table.preset_switch 는 필터 세 개를 번갈아 조회)
+#   pivot.*       : (H)(I)(J) 이전 방식의 차트용 pivot_table (비교 기준)
+#   charts.*      : log_charts 의 기간 단위 집계 + 다운샘플링 (일/주/월)
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.fake_gspread import FakeClient
+from benchmarks.synthetic_log import generate_values
+from log_charts import BUCKETS, chart_series
+from log_mirror import LogMirror
+from log_shards import ShardedLogMirror, row_shard_title
+from log_schema import TIMESTAMP_FORMAT, apply_schema
+
+FILE_NAME = "Cell Culture Log"
+TAB_NAME = "Log"
+APPEND_ROWS = 20   # 증분 동기화 측정 때 추가하는 행 수
+
+
+def measure(fn, repeat, setup=None):
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return times
+
+
+def bench_size(n_rows, repeat, emit, latency=0.0):
+    def record(name, times, **extra):
+        emit({"benchmark": name, "rows": n_rows, "repeat": len(times),
+              "best_s": min(times), "mean_s": sum(times) / len(times), **extra})
+
+    values = generate_values(n_rows, seed=n_rows)
+    client = FakeClient(latency=latency)
+    sheet = client.create(FILE_NAME).add_worksheet(TAB_NAME, values=values)
+    extra_rows = generate_values(APPEND_ROWS * (repeat + 1), seed=n_rows + 1)[1:]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # --- load_data ---
+        mirror = None
+        state = {"i": 0}
+
+        def fresh_mirror():
+            nonlocal mirror
+            state["i"] += 1
+            mirror = LogMirror(os.path.join(tmp, f"mirror_{state['i']}.sqlite3"))
+
+        def open_and_sync():
+            client.open(FILE_NAME).worksheet(TAB_NAME)
+            mirror.sync(sheet)
+
+        record("load_data.full", measure(open_and_sync, repeat, setup=fresh_mirror))
+
+        def append_new_rows():
+            k = state.setdefault("appended", 0)
+            sheet.append_rows(extra_rows[k:k + APPEND_ROWS])
+            state["appended"] = k + APPEND_ROWS
+
+        record("load_data.incremental", measure(open_and_sync, repeat, setup=append_new_rows),
+               new_rows=APPEND_ROWS)
+        record("load_data.unchanged", measure(open_and_sync, repeat))
+
+        # --- 월별 샤드 ---
+        sharded = client.create(f"{FILE_NAME} (sharded)")
+        shards = {}
+        for row in values[1:]:
+            shards.setdefault(row_shard_title(TAB_NAME, "month", row), []).append(row)
+        for title, rows in shards.items():
+            sharded.add_worksheet(title, values=[values[0]] + rows)
+        sharded_mirror = None
+
+        def fresh_sharded_mirror():
+            nonlocal sharded_mirror
+            state["i"] += 1
+            sharded_mirror = ShardedLogMirror(os.path.join(tmp, f"mirror_{state['i']}.sqlite3"),
+                                              TAB_NAME, "month")
+
+        record("sharded.full", measure(lambda: sharded_mirror.sync_shards(sharded), repeat,
+                                       setup=fresh_sharded_mirror), shards=len(shards))
+        record("sharded.unchanged", measure(lambda: sharded_mirror.sync_shards(sharded), repeat))
+
+        # --- (D) 전처리 ---
+        raw = pd.DataFrame(values[1:], columns=values[0])
+        record("preprocess.apply_schema", measure(lambda: apply_schema(raw), repeat))
+        record("preprocess.mirror_read", measure(lambda: mirror.query(), repeat))
+
+        # --- (E) 선택지 ---
+        record("options.cell_names", measure(lambda: mirror.distinct("Cell_Name"), repeat))
+        record("options.operators", measure(lambda: mirror.operators(), repeat))
+        record("options.date_bounds", measure(lambda: mirror.bounds("Timestamp"), repeat))
+        record("options.passage_bounds", measure(lambda: mirror.bounds("Passage_No"), repeat))
+        mirror.options()
+        record("options.cached", measure(mirror.options, repeat))
+
+        # --- (F) 필터 ---
+        cells = mirror.distinct("Cell_Name")[:3]
+        operators = mirror.operators()[:2]
+        ts_max = pd.to_datetime(mirror.bounds("Timestamp")[1])
+        date_range = ((ts_max - pd.Timedelta(days=90)).strftime(TIMESTAMP_FORMAT),
+                      ts_max.strftime(TIMESTAMP_FORMAT))
+        filters = {
+            "cell_name": {"cells": cells},
+            "date_range": {"date_range": date_range},
+            "operators": {"operators": operators},
+            "passage": {"passage_range": (5, 15)},
+            "viability": {"viability_range": (80.0, 100.0)},
+        }
+        filters["combined"] = {k: v for f in filters.values() for k, v in f.items()}
+        for name, kwargs in filters.items():
+            result_rows = len(mirror.query(**kwargs))
+            record(f"filter.{name}", measure(lambda: mirror.query(**kwargs), repeat),
+                   result_rows=result_rows)
+
+        # --- (G) 표 ---
+        def page(**kwargs):
+            return mirror.query(order_by="Viability_Percent", descending=True, limit=100, offset=0, **kwargs)
+
+        record("table.count", measure(lambda: mirror.count(**filters["viability"]), repeat,
+                                      setup=mirror._results.clear))
+        record("table.count_cached", measure(lambda: mirror.count(**filters["viability"]), repeat))
+        record("table.page", measure(lambda: page(**filters["viability"]), repeat, setup=mirror._results.clear))
+        record("table.page_cached", measure(lambda: page(**filters["viability"]), repeat))
+        presets = [filters["cell_name"], filters["viability"], filters["combined"]]
+        record("table.preset_switch", measure(lambda: [(mirror.count(**f), page(**f)) for f in presets], repeat))
+        record("table.export_csv", measure(lambda: mirror.export(io.BytesIO(), "csv", **filters["viability"]),
+                                           repeat))
+
+        # --- (H)(I)(J) 차트 ---
+        df = mirror.query()
+        pivots = {
+            "viability": ("Viability_Percent", "mean"),
+            "live_cells": ("Total_Live_Cells_in_Tube", "mean"),
+            "dishes": ("Total_Dishes_Made", "sum"),
+        }
+        for name, (column, aggfunc) in pivots.items():
+            def pivot():
+                chart_df = df.dropna(subset=[column, "Timestamp", "Cell_Name"])
+                return chart_df.pivot_table(index="Timestamp", columns="Cell_Name", values=column,
+                                            aggfunc=aggfunc, observed=True)
+            record(f"pivot.{name}", measure(pivot, repeat))
+        for bucket in BUCKETS.values():
+            points = sum(len(v) for v in chart_series(df, bucket).values())
+            record(f"charts.{bucket}", measure(lambda: chart_series(df, bucket), repeat), points=points)
+
+    emit({"benchmark": "sheets_api_calls", "rows": n_rows, "calls": dict(client.calls)})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="로그 조회 경로 벤치마크 (합성 일지, 네트워크 없음)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="합성 일지 행 수 (최대 1000000 정도까지 권장)")
+    parser.add_argument("--repeat", type=int, default=3, help="측정 반복 횟수 (최솟값/평균을 기록)")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="가짜 Sheets API 호출마다 기다릴 시간 (초)")
+    parser.add_argument("--output", default="-", help="JSON lines 출력 파일 (기본값: 표준 출력)")
+    args = parser.parse_args(argv)
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        def emit(record):
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+
+        for n_rows in args.sizes:
+            bench_size(n_rows, args.repeat, emit, latency=args.latency)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
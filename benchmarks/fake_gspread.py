@@ -0,0 +1,120 @@
+# 네트워크 없이 벤치마크를 돌리기 위한 gspread 대용 (메모리 안의 시트)
+# - 앱이 쓰는 메서드만 흉내 냅니다: open / worksheet / get_all_values / get_all_records /
+#   batch_get / append_row / append_rows
+# - Sheets API처럼 범위 읽기 결과에서는 행 끝의 빈 셀과 끝쪽의 빈 행을 잘라서 돌려줍니다.
+# - calls 에 메서드별 호출 수를 세고, latency 초만큼 호출마다 기다릴 수 있습니다.
+import time
+from collections import Counter
+
+from gspread.exceptions import SpreadsheetNotFound, WorksheetNotFound
+from gspread.utils import a1_range_to_grid_range, rowcol_to_a1
+
+
+def _trim(row):
+    end = len(row)
+    while end and row[end - 1] == "":
+        end -= 1
+    return row[:end]
+
+
+class FakeWorksheet:
+    def __init__(self, title, values=None, latency=0.0, calls=None):
+        self.title = title
+        self.values = [list(r) for r in values] if values else []
+        self.latency = latency
+        self.calls = calls if calls is not None else Counter()
+
+    def _call(self, name):
+        self.calls[name] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def get_all_values(self):
+        self._call("get_all_values")
+        width = max((len(r) for r in self.values), default=0)
+        return [list(r) + [""] * (width - len(r)) for r in self.values]
+
+    def get_all_records(self):
+        values = self.get_all_values()
+        if not values:
+            return []
+        header = values[0]
+        return [dict(zip(header, r)) for r in values[1:]]
+
+    def _read_range(self, a1):
+        grid = a1_range_to_grid_range(a1)
+        rows = self.values[grid.get("startRowIndex", 0):grid.get("endRowIndex")]
+        c0, c1 = grid.get("startColumnIndex", 0), grid.get("endColumnIndex")
+        out = [_trim(list(r[c0:c1])) for r in rows]
+        while out and not out[-1]:
+            out.pop()
+        return out
+
+    def batch_get(self, ranges):
+        self._call("batch_get")
+        return [self._read_range(r) for r in ranges]
+
+    def append_rows(self, rows, include_values_in_response=None, **kwargs):
+        # Sheets API 의 values.append 응답과 같은 형태로 돌려줍니다.
+        self._call("append_rows")
+        start = len(self.values) + 1
+        new_rows = [["" if v is None else str(v) for v in r] for r in rows]
+        self.values.extend(new_rows)
+        width = max((len(r) for r in new_rows), default=1)
+        updated_range = f"'{self.title}'!{rowcol_to_a1(start, 1)}:{rowcol_to_a1(start + len(new_rows) - 1, width)}"
+        updates = {"updatedRange": updated_range, "updatedRows": len(new_rows)}
+        if include_values_in_response:
+            updates["updatedData"] = {"range": updated_range, "values": [_trim(r) for r in new_rows]}
+        return {"updates": updates}
+
+    def append_row(self, row, **kwargs):
+        response = self.append_rows([row], **kwargs)
+        self.calls["append_rows"] -= 1
+        self.calls["append_row"] += 1
+        return response
+
+
+class FakeSpreadsheet:
+    def __init__(self, title, latency=0.0, calls=None):
+        self.title = title
+        self.latency = latency
+        self.calls = calls if calls is not None else Counter()
+        self._worksheets = {}
+
+    def add_worksheet(self, title, rows=1000, cols=26, values=None):
+        self.calls["add_worksheet"] += 1
+        ws = FakeWorksheet(title, values, self.latency, self.calls)
+        self._worksheets[title] = ws
+        return ws
+
+    def worksheet(self, title):
+        self.calls["worksheet"] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if title not in self._worksheets:
+            raise WorksheetNotFound(title)
+        return self._worksheets[title]
+
+    def worksheets(self):
+        self.calls["worksheets"] += 1
+        return list(self._worksheets.values())
+
+
+class FakeClient:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = Counter()
+        self._spreadsheets = {}
+
+    def create(self, title):
+        sh = FakeSpreadsheet(title, self.latency, self.calls)
+        self._spreadsheets[title] = sh
+        return sh
+
+    def open(self, title):
+        self.calls["open"] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if title not in self._spreadsheets:
+            raise SpreadsheetNotFound(title)
+        return self._spreadsheets[title]
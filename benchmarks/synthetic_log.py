@@ -0,0 +1,66 @@
+# 벤치마크용 합성 배양 일지
+# - 계산기의 log_data_list 와 같은 16개 컬럼, 같은 문자열 형식(.2e / .3f 등)으로 만듭니다.
+# - 계산값은 calc_engine 으로 구하므로 실제 일지와 같은 관계를 가집니다.
+import numpy as np
+import pandas as pd
+
+import calc_engine
+from log_schema import LOG_COLUMNS, TIMESTAMP_FORMAT
+
+CELL_NAMES = ["HeLa", "HEK293T", "CHO-K1", "A549", "MCF-7", "Jurkat", "NIH-3T3", "Vero",
+              "HepG2", "U2OS", "SH-SY5Y", "PC-3", "K562", "COS-7", "MDCK", "Caco-2",
+              "iPSC-01", "iPSC-02", "MSC-A", "HUVEC"]
+OPERATORS = ["김민수", "이지은", "박서준", "최유진", "정하늘", "강도윤",
+             "윤서연", "임재현", "한지민", "오세훈", "Alex", "Maria"]
+NOTES = ["", "", "", "", "", "", "", "", "", "배지 교체", "오염 의심 - 관찰 필요", "해동 후 첫 계대"]
+
+
+def generate_values(n_rows, seed=0, start="2020-01-01", days=5 * 365):
+    # 헤더 + n_rows 개의 행 (모두 문자열, get_all_values() 결과와 같은 형태)
+    rng = np.random.default_rng(seed)
+    n = int(n_rows)
+
+    squares = rng.integers(1, calc_engine.MAX_SQUARES + 1, n)
+    unused = np.arange(calc_engine.MAX_SQUARES) >= squares[:, None]
+    live = np.where(unused, np.nan, rng.poisson(80, (n, calc_engine.MAX_SQUARES)))
+    dead = np.where(unused, np.nan, rng.poisson(6, (n, calc_engine.MAX_SQUARES)))
+    dilution = rng.choice([2.0, 2.0, 4.0, 5.0], n)
+    stock_vol = np.round(rng.uniform(1.0, 10.0, n), 1)
+    target = rng.choice([2.0e5, 5.0e5, 5.0e5, 1.0e6], n)
+    pipette = rng.choice([1.0, 2.0, 2.0, 3.0], n)
+    res = calc_engine.calculate(live, dead, dilution, stock_vol, target, pipette, num_squares=squares)
+    # 실제 일지에는 계산에 성공한 시료만 저장되므로 실패한 시료는 목표 세포 수를 낮춰 다시 계산합니다.
+    failed = res["error"] != calc_engine.OK
+    if failed.any():
+        target = np.where(failed, 1.0e5, target)
+        pipette = np.where(failed, 10.0, pipette)
+        res = calc_engine.calculate(live, dead, dilution, stock_vol, target, pipette, num_squares=squares)
+
+    seconds = np.sort(rng.integers(0, days * 86400, n))
+    timestamps = (pd.Timestamp(start) + pd.to_timedelta(seconds, unit="s")).strftime(TIMESTAMP_FORMAT)
+    n_ops = rng.integers(1, 4, n)
+    op_idx = rng.integers(0, len(OPERATORS), (n, 3))
+    operators = [", ".join(dict.fromkeys(OPERATORS[j] for j in op_idx[i, :k])) for i, k in enumerate(n_ops)]
+
+    def fmt(fmt_str, values):
+        return np.char.mod(fmt_str, values).tolist()
+
+    columns = [
+        list(timestamps),
+        np.asarray(CELL_NAMES)[rng.integers(0, len(CELL_NAMES), n)].tolist(),
+        fmt("%d", rng.integers(1, 41, n)),
+        operators,
+        np.asarray(NOTES)[rng.integers(0, len(NOTES), n)].tolist(),
+        fmt("%.2f", res["viability"]),
+        fmt("%d", res["total_live_cells_counted"]),
+        fmt("%d", res["total_dead_cells_counted"]),
+        fmt("%.2e", res["cells_per_ml"]),
+        fmt("%.2e", res["total_live_cells_in_tube"]),
+        fmt("%g", stock_vol),
+        fmt("%.2e", target),
+        fmt("%g", pipette),
+        fmt("%.3f", res["media_to_add"]),
+        fmt("%.3f", res["total_working_volume"]),
+        fmt("%d", res["total_dishes_final"]),
+    ]
+    return [list(LOG_COLUMNS)] + [list(row) for row in zip(*columns)]
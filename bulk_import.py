@@ -0,0 +1,167 @@
+# 자동 세포 계수기 내보내기 파일(CSV/XLSX) 일괄 가져오기
+# - 파일을 CHUNK_ROWS 행씩 나눠 읽고, 청크마다 calc_engine 으로 계산해서 일지 행을 만듭니다.
+#   (한 번에 메모리에 올리는 행은 청크 하나뿐)
+# - 입력 컬럼은 calc_engine CSV 일괄 계산과 같고, 일지 정보 컬럼을 더 받습니다.
+#   Cell_Name (필수), Passage_No, Operators, Notes, Timestamp (없으면 가져온 시각)
+# - 계산 오류나 값 오류가 있는 행은 건너뛰고 (파일의 행 번호, 사유)를 돌려줍니다.
+# - 만든 일지 행은 put_rows(행 목록)로 청크마다 넘깁니다. (앱에서는 저장 대기열에 넣어 묶어서 전송)
+#
+# 시트에 쓰지 않고 일지 행만 확인하려면:
+#   python bulk_import.py counter_export.xlsx -o log_rows.csv
+import argparse
+import csv
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+import calc_engine
+from log_schema import LOG_COLUMNS, TIMESTAMP_FORMAT, format_log_row
+
+CHUNK_ROWS = 5000
+MAX_ERRORS = 100   # 돌려주는 오류 사유의 최대 개수 (개수는 전부 셈)
+NUMERIC_INPUTS = ("Counted_Total_Live", "Counted_Total_Dead", "Num_Squares", *calc_engine.DEFAULTS)
+
+
+def _read_xlsx(fileobj, chunksize):
+    try:
+        from openpyxl import load_workbook
+    except ImportError as e:
+        raise RuntimeError("XLSX 파일을 읽으려면 openpyxl 패키지가 필요합니다.") from e
+    # read_only 모드는 시트를 한 행씩 읽습니다. (파일 전체를 셀 객체로 만들지 않음)
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [str(c).strip() if c is not None else "" for c in next(rows, [])]
+        chunk = []
+        for row in rows:
+            if any(v is not None and v != "" for v in row):
+                chunk.append(row[:len(header)])
+            if len(chunk) >= chunksize:
+                yield pd.DataFrame(chunk, columns=header)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=header)
+    finally:
+        workbook.close()
+
+
+def _is_xlsx(name):
+    return str(name).lower().endswith((".xlsx", ".xlsm"))
+
+
+def read_chunks(fileobj, name, chunksize=CHUNK_ROWS):
+    # 파일 이름의 확장자로 형식을 고릅니다. DataFrame 을 chunksize 행씩 돌려줍니다.
+    if _is_xlsx(name):
+        yield from _read_xlsx(fileobj, chunksize)
+    else:
+        for chunk in pd.read_csv(fileobj, chunksize=chunksize, skipinitialspace=True):
+            chunk.columns = [str(c).strip() for c in chunk.columns]
+            yield chunk
+
+
+def prepare_chunk(df, first_row_no, imported_at):
+    # 청크 하나를 계산해서 (일지 행 목록, [(행 번호, 사유), ...])를 돌려줍니다.
+    if "Cell_Name" not in df.columns:
+        raise ValueError("Cell_Name 컬럼이 필요합니다.")
+    df = df.reset_index(drop=True)
+    # 숫자가 아닌 입력 값은 계산 전에 표시해 둡니다. (빈 칸은 계수하지 않은 칸)
+    not_numeric = pd.Series(False, index=df.index)
+    for column in df.columns:
+        if column in NUMERIC_INPUTS or column.startswith(("Live_", "Dead_")):
+            values = pd.to_numeric(df[column], errors="coerce")
+            not_numeric |= df[column].notna() & values.isna()
+            df[column] = values
+    for column, value in calc_engine.DEFAULTS.items():
+        if column not in df.columns:
+            df[column] = value   # 일지에도 사용한 조건을 남깁니다.
+    out = calc_engine.calculate_frame(df)
+    missing = out[list(calc_engine.RESULT_COLUMNS.values())].isna().any(axis=1)
+
+    if "Timestamp" in df.columns:
+        parsed = pd.to_datetime(df["Timestamp"], errors="coerce", format="mixed")
+        bad_time = df["Timestamp"].notna() & parsed.isna()
+        out["Timestamp"] = parsed.dt.strftime(TIMESTAMP_FORMAT).where(parsed.notna(), imported_at)
+    else:
+        bad_time = pd.Series(False, index=df.index)
+        out["Timestamp"] = imported_at
+    if "Passage_No" in df.columns:
+        out["Passage_No"] = pd.to_numeric(df["Passage_No"], errors="coerce").round().astype("Int64")
+    out["Cell_Name"] = df["Cell_Name"].where(df["Cell_Name"].notna(), "").astype(str).str.strip()
+
+    # 먼저 걸린 사유 하나만 기록합니다. (계산 오류 -> 값 오류 순서)
+    reason = out["Error"].where(out["Error"] != "")
+    for mask, message in ((not_numeric, "숫자가 아닌 계수/조건 값이 있습니다."),
+                          (missing, "계산에 필요한 값이 비어 있습니다."),
+                          (out["Cell_Name"] == "", "세포 이름(Cell_Name)이 비어 있습니다."),
+                          (bad_time, "Timestamp 값을 읽을 수 없습니다.")):
+        reason = reason.where(reason.notna() | ~mask, message)
+    failed = reason.notna()
+    errors = list(zip((reason.index[failed] + first_row_no).tolist(), reason[failed].tolist()))
+    rows = [format_log_row(record) for record in out[~failed].to_dict("records")]
+    return rows, errors
+
+
+def import_file(fileobj, name, put_rows, chunksize=CHUNK_ROWS, progress=None):
+    # 파일 전체를 가져옵니다. progress(처리한 행 수, 진행률 0~1 또는 None)를 청크마다 호출합니다.
+    # (XLSX는 압축 파일이라 읽은 위치로 진행률을 알 수 없으므로 항상 None)
+    imported_at = datetime.now().strftime(TIMESTAMP_FORMAT)
+    size = None if _is_xlsx(name) else _size(fileobj)
+    result = {"rows": 0, "imported": 0, "n_errors": 0, "errors": []}
+    for chunk in read_chunks(fileobj, name, chunksize):
+        rows, errors = prepare_chunk(chunk, result["rows"] + 2, imported_at)   # 1행은 헤더
+        if rows:
+            put_rows(rows)
+        result["rows"] += len(chunk)
+        result["imported"] += len(rows)
+        result["n_errors"] += len(errors)
+        result["errors"] += errors[:MAX_ERRORS - len(result["errors"])]
+        if progress:
+            progress(result["rows"], _position(fileobj, size))
+    return result
+
+
+def _size(fileobj):
+    try:
+        return fileobj.seek(0, 2) or None
+    except (AttributeError, OSError):
+        return None
+    finally:
+        try:
+            fileobj.seek(0)
+        except (AttributeError, OSError):
+            pass
+
+
+def _position(fileobj, size):
+    # CSV는 읽은 위치로 진행률을 어림합니다. (크기를 모르면 None)
+    try:
+        return min(fileobj.tell() / size, 1.0) if size else None
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="자동 계수기 파일 -> 일지 행 (CSV 출력, 시트에는 쓰지 않음)")
+    parser.add_argument("input", help="CSV 또는 XLSX 파일")
+    parser.add_argument("-o", "--output", default="-", help="일지 행 CSV 파일 (기본값: 표준 출력)")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_ROWS, help="한 번에 읽는 행 수")
+    args = parser.parse_args(argv)
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+    try:
+        writer = csv.writer(out)
+        writer.writerow(LOG_COLUMNS)
+        with open(args.input, "rb") as f:
+            result = import_file(f, args.input, writer.writerows, args.chunksize)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    for row_no, reason in result["errors"]:
+        print(f"{row_no}행: {reason}", file=sys.stderr)
+    print(f"{result['imported']}/{result['rows']}행을 변환했습니다. (오류 {result['n_errors']}행)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
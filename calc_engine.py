@@ -0,0 +1,236 @@
+# 세포 수 계산 엔진 (Streamlit과 무관한 순수 계산)
+# - N개 시료를 NumPy 배열로 받아 희석/생존률/분주용 농도/접시 수를 한 번에 계산합니다.
+# - 시료별 오류는 error 코드 배열로 돌려주며, 오류가 난 시료의 계산값(생존률, 계수 합계, 농도 포함)은 NaN 입니다.
+#   입력 조건(부피, 목표 세포 수)은 그대로 돌려줍니다.
+#
+# CSV 일괄 계산:
+#   python calc_engine.py samples.csv -o results.csv
+#   입력 컬럼: Live_1..Live_9 / Dead_1..Dead_9 (칸별 계수) 또는
+#              Counted_Total_Live / Counted_Total_Dead + Num_Squares (합계),
+#              Dilution, Stock_Volume_ml, Target_Cells_per_Dish, Seeding_Volume_per_Dish_ml
+#   (없는 조건 컬럼은 계산기 기본값을 사용합니다)
+import argparse
+import sys
+
+import numpy as np
+
+HEMOCYTOMETER_FACTOR = 10000   # 혈구계산판 한 칸의 부피 환산 (cells/mL)
+MAX_SQUARES = 9
+
+DEFAULTS = {
+    "Dilution": 2.0,
+    "Stock_Volume_ml": 5.0,
+    "Target_Cells_per_Dish": 5.0e5,
+    "Seeding_Volume_per_Dish_ml": 2.0,
+}
+
+# 오류 코드 (계산기와 같은 순서로 검사합니다)
+OK = 0
+ERR_NO_SQUARES = 1
+ERR_ZERO_CONCENTRATION = 2
+ERR_ZERO_TARGET = 3
+ERR_BAD_PIPETTE = 4
+ERR_TOO_DILUTE = 5
+ERR_BAD_INPUT = 6   # 빈 칸/숫자가 아닌 입력 (CSV 등). 다른 오류보다 먼저 검사합니다.
+
+ERROR_MESSAGES = {
+    ERR_BAD_INPUT: "!오류: 계수 합계나 조건(칸 수, 희석 배수, 부피, 목표 세포 수)에 비어 있거나 숫자가 아닌 값이 있습니다.",
+    ERR_NO_SQUARES: "!오류: '계수한 칸의 수'는 0보다 커야 합니다.",
+    ERR_ZERO_CONCENTRATION: "!오류: 1단계에서 계산된 '살아있는' 세포 농도가 0입니다.",
+    ERR_ZERO_TARGET: "!오류: '목표 세포 수'는 0보다 커야 합니다.",
+    ERR_BAD_PIPETTE: "!오류: '심을 부피'는 0보다 커야 합니다.",
+    ERR_TOO_DILUTE: "⚠️ [제조 불가] 경고! 현탁액 농도({cells_per_ml:.2e})가 ...",
+}
+
+# 시료 한 개의 결과에서 정수로 표시하는 값
+_INT_KEYS = ("total_all_cells_counted", "total_live_cells_counted", "total_dead_cells_counted",
+             "available_dishes", "total_dishes_final")
+
+
+def _totals(counts, name):
+    counts = np.asarray(counts, dtype=float)
+    if counts.ndim == 2:
+        # 칸별 계수: 계수하지 않은 칸은 NaN
+        return np.nansum(counts, axis=1), np.sum(~np.isnan(counts), axis=1)
+    if counts.ndim == 1:
+        return counts, None
+    raise ValueError(f"{name}: 1차원(합계) 또는 2차원(칸별) 배열이어야 합니다.")
+
+
+def calculate(live_counts, dead_counts, dilution, stock_volume, target_cells, pipette_volume,
+              num_squares=None, invalid=None):
+    # live_counts / dead_counts: (N, 칸 수) 칸별 계수 또는 (N,) 합계
+    # num_squares: 합계를 넘길 때는 필수, 칸별 계수일 때는 NaN이 아닌 Live 칸 수가 기본값
+    # invalid: (N,) 숫자로 바꾸지 못한 입력이 있는 시료 (CSV의 문자열 등, ERR_BAD_INPUT 으로 표시)
+    total_live, counted_squares = _totals(live_counts, "live_counts")
+    total_dead, _ = _totals(dead_counts, "dead_counts")
+    if num_squares is None:
+        if counted_squares is None:
+            raise ValueError("합계를 넘길 때는 num_squares가 필요합니다.")
+        num_squares = counted_squares
+    n = len(total_live)
+    num_squares, dilution, stock_volume, target_cells, pipette_volume = (
+        np.broadcast_to(np.asarray(v, dtype=float), (n,))
+        for v in (num_squares, dilution, stock_volume, target_cells, pipette_volume)
+    )
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        total_all = total_live + total_dead
+        viability = np.where(total_all > 0, total_live / total_all * 100, 0.0)
+        cells_per_ml = total_live / num_squares * dilution * HEMOCYTOMETER_FACTOR
+        total_live_in_tube = cells_per_ml * stock_volume
+        required_volume = target_cells / cells_per_ml
+        available_dishes = np.floor_divide(total_live_in_tube, target_cells)
+        concentration_working = target_cells / pipette_volume
+        total_working_volume = total_live_in_tube / concentration_working
+        media_to_add = total_working_volume - stock_volume
+        total_dishes_final = np.floor(total_working_volume / pipette_volume)
+
+    bad_input = ~np.isfinite(total_live) | ~np.isfinite(total_dead)
+    if invalid is not None:
+        bad_input |= np.asarray(invalid, dtype=bool)
+    for v in (num_squares, dilution, stock_volume, target_cells, pipette_volume):
+        bad_input |= ~np.isfinite(v)
+
+    # 먼저 걸린 오류 하나만 기록합니다.
+    error = np.select(
+        [bad_input,
+         num_squares <= 0,
+         cells_per_ml == 0,
+         target_cells == 0,
+         pipette_volume <= 0,
+         cells_per_ml < concentration_working],
+        [ERR_BAD_INPUT, ERR_NO_SQUARES, ERR_ZERO_CONCENTRATION, ERR_ZERO_TARGET, ERR_BAD_PIPETTE, ERR_TOO_DILUTE],
+        default=OK,
+    ).astype(np.int8)
+
+    failed = error != OK
+
+    def derived(values):
+        return np.where(failed, np.nan, values)
+
+    return {
+        "error": error,
+        "cells_per_ml": derived(cells_per_ml),
+        "cells_per_ml_raw": cells_per_ml,   # 오류 메시지용 (마스킹하지 않은 값)
+        "total_live_cells_in_tube": derived(total_live_in_tube),
+        "total_stock_vol": np.asarray(stock_volume),
+        "total_all_cells_counted": derived(total_all),
+        "total_live_cells_counted": derived(total_live),
+        "total_dead_cells_counted": derived(total_dead),
+        "viability": derived(viability),
+        "required_volume": derived(required_volume),
+        "available_dishes": derived(available_dishes),
+        "target_cells": np.asarray(target_cells),
+        "pipette_volume": np.asarray(pipette_volume),
+        "concentration_working": derived(concentration_working),
+        "total_working_volume": derived(total_working_volume),
+        "media_to_add": derived(media_to_add),
+        "total_dishes_final": derived(total_dishes_final),
+    }
+
+
+def error_message(results, i):
+    code = int(results["error"][i])
+    if code == OK:
+        return ""
+    return ERROR_MESSAGES[code].format(cells_per_ml=results["cells_per_ml_raw"][i])
+
+
+def result_row(results, i):
+    # i번째 시료의 결과를 계산기 화면에서 쓰는 dict 형태로 꺼냅니다.
+    row = {k: float(v[i]) for k, v in results.items() if k not in ("error", "cells_per_ml_raw")}
+    for k in _INT_KEYS:
+        row[k] = int(row[k])
+    return row
+
+
+# --- DataFrame / CSV ---
+RESULT_COLUMNS = {
+    "viability": "Viability_Percent",
+    "total_live_cells_counted": "Counted_Total_Live",
+    "total_dead_cells_counted": "Counted_Total_Dead",
+    "cells_per_ml": "Stock_Concentration_cells_ml",
+    "total_live_cells_in_tube": "Total_Live_Cells_in_Tube",
+    "required_volume": "Required_Volume_per_Dish_ml",
+    "available_dishes": "Available_Dishes",
+    "concentration_working": "Working_Concentration_cells_ml",
+    "media_to_add": "Media_to_Add_ml",
+    "total_working_volume": "Total_Final_Volume_ml",
+    "total_dishes_final": "Total_Dishes_Made",
+}
+
+
+# 일지에 함께 저장하는 입력 조건
+INPUT_COLUMNS = {
+    "total_stock_vol": "Stock_Volume_ml",
+    "target_cells": "Target_Cells_per_Dish",
+    "pipette_volume": "Seeding_Volume_per_Dish_ml",
+}
+
+
+def named_row(row):
+    # result_row() 의 결과를 일지 컬럼 이름으로 바꿉니다.
+    return {column: row[key] for key, column in {**RESULT_COLUMNS, **INPUT_COLUMNS}.items()}
+
+
+def calculate_frame(df):
+    # 시료 한 행씩 담긴 DataFrame을 받아 결과 컬럼과 Error 컬럼을 붙여 돌려줍니다.
+    import pandas as pd   # 계산기 화면(calculate)만 쓸 때는 pandas 를 불러오지 않습니다.
+    invalid = np.zeros(len(df), dtype=bool)
+
+    def numeric(columns):
+        # 빈 칸은 NaN, 숫자가 아닌 값도 NaN 으로 바꾸고 그 시료는 invalid 로 표시합니다.
+        raw = df.reindex(columns=columns)
+        values = raw.apply(pd.to_numeric, errors="coerce")
+        invalid[:] |= (raw.notna() & values.isna()).any(axis=1).to_numpy()
+        return values.to_numpy(dtype=float)
+
+    live_cols = [f"Live_{i}" for i in range(1, MAX_SQUARES + 1) if f"Live_{i}" in df.columns]
+    num_squares = numeric(["Num_Squares"])[:, 0] if "Num_Squares" in df.columns else None
+    if live_cols:
+        live = numeric(live_cols)
+        dead = numeric([c.replace("Live_", "Dead_") for c in live_cols])
+        dead = np.where(np.isnan(live), np.nan, np.nan_to_num(dead))   # Dead 칸이 비어 있으면 0
+    elif "Counted_Total_Live" in df.columns:
+        if num_squares is None:
+            raise ValueError("Counted_Total_Live 를 쓸 때는 Num_Squares 컬럼이 필요합니다.")
+        live = numeric(["Counted_Total_Live"])[:, 0]
+        dead = numeric(["Counted_Total_Dead"])[:, 0] if "Counted_Total_Dead" in df.columns else np.zeros(len(df))
+        dead = np.nan_to_num(dead)   # 비어 있으면 0
+    else:
+        raise ValueError("Live_1..Live_9 또는 Counted_Total_Live 컬럼이 필요합니다.")
+
+    conditions = [
+        numeric([c])[:, 0] if c in df.columns else DEFAULTS[c]
+        for c in ("Dilution", "Stock_Volume_ml", "Target_Cells_per_Dish", "Seeding_Volume_per_Dish_ml")
+    ]
+    results = calculate(live, dead, *conditions, num_squares=num_squares, invalid=invalid)
+
+    out = df.copy()
+    for key, column in RESULT_COLUMNS.items():
+        if column in df.columns and key in ("total_live_cells_counted", "total_dead_cells_counted"):
+            continue   # 입력으로 받은 합계는 그대로 둡니다. (오류가 난 시료도 입력 값이 남도록)
+        out[column] = results[key]
+    out["Error"] = [error_message(results, i) for i in range(len(df))]
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="세포 수 일괄 계산 (CSV 입력 -> CSV 출력)")
+    parser.add_argument("input", help="시료 CSV 파일 ('-' 이면 표준 입력)")
+    parser.add_argument("-o", "--output", default="-", help="결과 CSV 파일 (기본값: 표준 출력)")
+    args = parser.parse_args(argv)
+
+    import pandas as pd
+    df = pd.read_csv(sys.stdin if args.input == "-" else args.input)
+    out = calculate_frame(df)
+    out.to_csv(sys.stdout if args.output == "-" else args.output, index=False)
+    failed = int((out["Error"] != "").sum())
+    if failed:
+        print(f"{failed}/{len(out)}개 시료에서 오류가 발생했습니다.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
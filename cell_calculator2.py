@@ -1,14 +1,17 @@
 import streamlit as st
-import math
 from datetime import datetime
-import gspread 
 import json 
+import io
 import base64 
-from google.oauth2.service_account import Credentials 
-import pandas as pd 
+from concurrent.futures import Future, ThreadPoolExecutor
+import calc_engine
+from metrics import METRICS, instrument_gspread
+# gspread / google-auth / pandas 와 이를 쓰는 모듈(log_*, bulk_import)은 처음 쓰는 곳에서 import 합니다.
+# (계산기는 이 모듈들 없이 바로 그려지고, Google 인증은 백그라운드에서 진행)
 
 # --- 1. 앱의 기본 설정 ---
 st.set_page_config(page_title="세포 수 계산기 v32 (로그 조회)", layout="wide")
+METRICS.begin_run() # 이번 실행의 구간별 소요 시간 기록 시작
 st.title("🔬 간단한 세포 수 계산기 v32")
 st.write("계산기 탭에서 일지를 기록하고, 로그 조회 탭에서 데이터를 확인하세요.")
 
@@ -16,46 +19,138 @@ st.write("계산기 탭에서 일지를 기록하고, 로그 조회 탭에서 
 # (v31과 동일)
 SHEET_FILE_NAME = "Cell Culture Log" # ⬅️ (v27에서 설정한 파일 이름)
 SHEET_TAB_NAME = "Log"               # ⬅️ (v27에서 설정한 탭 이름)
+SHEET_SHARD_MODE = None              # None: 탭 하나 / "month", "year": 기간별 탭(Log_2025-03 등)에 나눠 저장
+OUTBOX_PATH = "log_outbox.sqlite3"   # 시트 반영 전 일지를 보관하는 로컬 대기열
+MIRROR_PATH = "log_mirror.sqlite3"   # 로그 조회 탭이 읽는 로컬 사본
+METRICS_JSONL_PATH = "metrics.jsonl" # 실행마다 구간별 소요 시간을 한 줄씩 기록
+METRICS_PROM_PATH = "metrics.prom"   # 누적 통계 (Prometheus 텍스트 형식, 모니터링용)
 
-@st.cache_resource(ttl=600)
-def get_gspread_client():
-    try:
+def authorize(base64_string):
+    # (백그라운드 스레드) 무거운 모듈 import + 서비스 계정 인증
+    with METRICS.span("auth"):
+        import gspread
+        from google.oauth2.service_account import Credentials
         scope = [
             'https://www.googleapis.com/auth/spreadsheets',
             'https://www.googleapis.com/auth/drive'
         ]
-        base64_string = st.secrets["gcp_json_base64"]
         json_string = base64.b64decode(base64_string).decode("utf-8")
         creds_dict = json.loads(json_string) 
         creds = Credentials.from_service_account_info(creds_dict, scopes=scope)
         client = gspread.authorize(creds)
-        return client, None
-    except Exception as e:
-        return None, f"Google 인증 실패: {e}"
+    instrument_gspread(client) # Sheets API 호출 수/바이트 집계
+    return client
+
+@st.cache_resource
+def get_gspread_client():
+    # 인증을 백그라운드에서 시작하고 바로 돌아옵니다. (결과는 Future)
+    # 성공한 client 는 토큰을 스스로 갱신하므로 ttl 없이 계속 씁니다. 실패하면 '다시 연결' 버튼으로 새로 시도합니다.
+    METRICS.inc("cache_misses.gspread_client")
+    try:
+        base64_string = st.secrets["gcp_json_base64"]
+    except Exception as e: # secrets 파일/항목이 없음 (Google 미설정): 실패한 Future 로 돌려줌
+        future = Future()
+        future.set_exception(e)
+        return future
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="google-auth")
+    future = executor.submit(authorize, base64_string)
+    executor.shutdown(wait=False)
+    return future
+
+@st.cache_resource
+def get_log_mirror():
+    # 세션 간에 공유되는 로컬 사본 (마지막으로 읽은 행 이후만 새로 가져옴)
+    from log_mirror import LogMirror
+    from log_shards import ShardedLogMirror
+    if SHEET_SHARD_MODE:
+        # 지난 기간의 탭은 한 번만 읽고, 현재 기간의 탭만 다시 확인합니다. (모드별로 따로 보관)
+        return ShardedLogMirror(MIRROR_PATH.replace(".sqlite3", f"_{SHEET_SHARD_MODE}.sqlite3"),
+                                SHEET_TAB_NAME, SHEET_SHARD_MODE)
+    return LogMirror(MIRROR_PATH)
+
+@st.cache_resource
+def get_log_outbox():
+    # 저장 대기열과 백그라운드 전송 스레드는 앱 프로세스당 하나만 둡니다.
+    # (일괄 가져오기로 행이 많이 쌓여도 API 호출 수가 늘지 않도록 한 번에 500행씩 전송)
+    from log_outbox import LogOutbox
+    outbox = LogOutbox(OUTBOX_PATH, SHEET_FILE_NAME, SHEET_TAB_NAME, batch_size=500,
+                       shard_mode=SHEET_SHARD_MODE)
+    outbox.on_flushed = get_log_mirror().apply_append # 저장된 행을 로컬 사본에 바로 반영
+    outbox.start()
+    return outbox
 
 @st.cache_data(ttl=60)
-def load_data(_client): 
+def load_data(_client, full=False):
+    # 시트의 새 행을 로컬 사본에 반영합니다. (오류 메시지 반환)
+    # full: 시트 전체를 다시 읽기 (새로고침 버튼, 행 수가 같은 수정/삭제도 반영. 샤드 모드는 닫힌 탭까지)
+    # 화면의 캐시들은 이 함수가 아니라 mirror.version(데이터 버전)을 키로 씁니다.
+    METRICS.inc("cache_misses.load_data")
     try:
-        sh = _client.open(SHEET_FILE_NAME)
-        sheet = sh.worksheet(SHEET_TAB_NAME)
-        data = sheet.get_all_records() 
-        df = pd.DataFrame(data) 
-        return df, None
+        with METRICS.span("sheets.open"):
+            sh = _client.open(SHEET_FILE_NAME)
+            sheet = None if SHEET_SHARD_MODE else sh.worksheet(SHEET_TAB_NAME)
+        with METRICS.span("sheets.sync"):
+            if SHEET_SHARD_MODE:
+                get_log_mirror().sync_shards(sh, full=full) # 샤드 탭들을 동시에 읽어서 합침
+            else:
+                get_log_mirror().sync(sheet, full)
+        return None
     except Exception as e:
-        return pd.DataFrame(), f"Google Sheets 데이터 로드 실패: {e}"
+        return f"Google Sheets 데이터 동기화 실패: {e}"
+
+@st.cache_data(max_entries=32)
+def get_chart_data(data_version, filter_key, bucket):
+    # 같은 데이터 버전 + 같은 필터 + 같은 집계 단위면 다시 조회/집계하지 않습니다.
+    import log_charts
+    METRICS.inc("cache_misses.chart_data")
+    with METRICS.span("charts.query"):
+        df_filtered = get_log_mirror().query(**dict(filter_key))
+    with METRICS.span("charts.aggregate"):
+        return log_charts.chart_series(df_filtered, bucket)
+
+def save_run_metrics(record):
+    # 실행(또는 fragment 재실행) 한 번의 기록을 모니터링용 파일에 남깁니다. (모아서 10초에 한 번 씀)
+    try:
+        METRICS.export(METRICS_JSONL_PATH, METRICS_PROM_PATH, record)
+    except OSError:
+        pass # 기록 파일을 쓸 수 없어도 앱은 계속 동작
+
+@st.fragment(run_every=1)
+def wait_for_auth(auth_future):
+    # 인증이 끝나면 앱 전체를 한 번 다시 실행해서 저장 폼과 로그 조회를 켭니다.
+    if auth_future.done():
+        st.rerun()
+    st.caption("⏳ Google Sheets 연결 중... (계산기는 바로 사용할 수 있습니다)")
 
 # --- 3. 앱 실행 ---
-client, auth_error_msg = get_gspread_client()
-if auth_error_msg:
+METRICS.inc("cache_calls.gspread_client")
+auth_future = get_gspread_client()
+client, auth_error_msg, outbox = None, None, None
+if not auth_future.done():
+    wait_for_auth(auth_future)
+elif auth_future.exception() is not None:
+    auth_error_msg = f"Google 인증 실패: {auth_future.exception()}"
     st.error(auth_error_msg)
-    st.warning("Secrets 설정, API 권한, 봇 초대, 파일/탭 이름을 다시 확인하세요.")
-    st.stop() 
+    st.warning("Secrets 설정, API 권한, 봇 초대, 파일/탭 이름을 다시 확인하세요. (계산기는 사용할 수 있습니다)")
+    if st.button("다시 연결", key="auth_retry"):
+        get_gspread_client.clear()
+        st.rerun()
+else:
+    client = auth_future.result()
+    outbox = get_log_outbox()
+    outbox.bind(client)
 
 tab1, tab2 = st.tabs(["🔬 계산기", "📊 로그 조회"])
 
 
 # --- 4. 탭 1: 계산기 (v32 수정됨) ---
-with tab1:
+# 계산기와 로그 조회는 각각 fragment로 분리되어 있어서, 한쪽 위젯을 바꾸면 그쪽만 다시 실행됩니다.
+# (계산기 입력 중에는 로그 동기화/필터/차트가 다시 실행되지 않음)
+# 세션 상태 키도 계산기는 calc_*, 로그 조회는 log_* 로 나눠 씁니다.
+# (선택지/범위가 데이터에서 오는 필터 위젯은 key 없이 두어, 새 데이터가 들어오면 다시 '전체 선택'으로 시작합니다.)
+@st.fragment
+@METRICS.run("calculator", on_end=save_run_metrics)
+def calculator_tab():
     # (v31의 사이드바 코드는 그대로 사용)
     st.sidebar.header("[1단계] 세포 계수 정보")
     num_squares_counted = st.sidebar.number_input("1. 계수한 칸의 수", min_value=1, max_value=9, value=4, step=1)
@@ -92,38 +187,29 @@ with tab1:
     
     st.sidebar.header("[4단계] 일지 정보 입력")
     num_operators = st.sidebar.number_input("총 작업자 수:", min_value=1, value=1, step=1)
+
+    # 시트 반영 대기 중인 일지 수 (Google 연결 후)
+    if outbox is not None:
+        pending_logs = outbox.pending_count()
+        if pending_logs:
+            st.sidebar.caption(f"⏳ Google Sheet 반영 대기 중인 일지: {pending_logs}건")
+        dead_logs = outbox.dead_count()
+        if dead_logs:
+            st.sidebar.error(f"시트가 거부해서 보내지 못한 일지: {dead_logs}건 ({OUTBOX_PATH} 의 outbox_dead 테이블에 보관)")
+        if outbox.last_error:
+            st.sidebar.warning(f"시트 전송 재시도 중: {outbox.last_error}")
     
-    # (v31의 계산 함수)
+    # (계산은 calc_engine에서 처리 - 시료 1개짜리 일괄 계산)
     def perform_calculation():
         try:
-            if num_squares_counted <= 0: st.error("!오류: '계수한 칸의 수'는 0보다 커야 합니다."); return False
-            total_live_cells_counted = sum(live_cell_counts)
-            total_dead_cells_counted = sum(dead_cell_counts)
-            total_all_cells_counted = total_live_cells_counted + total_dead_cells_counted
-            avg_live_count = float(total_live_cells_counted) / float(num_squares_counted)
-            if total_all_cells_counted > 0: viability = (float(total_live_cells_counted) / float(total_all_cells_counted)) * 100
-            else: viability = 0.0 
-            cells_per_ml = avg_live_count * dilution * 10000
-            total_live_cells_in_tube = cells_per_ml * total_stock_vol
-            if cells_per_ml == 0: st.error("!오류: 1단계에서 계산된 '살아있는' 세포 농도가 0입니다."); return False
-            required_volume = target_cells / cells_per_ml
-            available_dishes = int(total_live_cells_in_tube // target_cells)
-            if pipette_volume <= 0: st.error("!오류: '심을 부피'는 0보다 커야 합니다."); return False
-            concentration_working = target_cells / pipette_volume
-            if cells_per_ml < concentration_working: st.error(f"⚠️ [제조 불가] 경고! 현탁액 농도({cells_per_ml:.2e})가 ..."); return False
-            total_working_volume = total_live_cells_in_tube / concentration_working
-            media_to_add = total_working_volume - total_stock_vol
-            total_dishes_final = math.floor(total_working_volume / pipette_volume)
-            
-            st.session_state.results = {
-                "cells_per_ml": cells_per_ml, "total_live_cells_in_tube": total_live_cells_in_tube,
-                "total_stock_vol": total_stock_vol, "total_all_cells_counted": total_all_cells_counted,
-                "total_live_cells_counted": total_live_cells_counted, "total_dead_cells_counted": total_dead_cells_counted,
-                "viability": viability, "required_volume": required_volume, "available_dishes": available_dishes,
-                "target_cells": target_cells, "pipette_volume": pipette_volume, "concentration_working": concentration_working,
-                "total_working_volume": total_working_volume, "media_to_add": media_to_add,
-                "total_dishes_final": total_dishes_final
-            }
+            with METRICS.span("calc.compute"):
+                calc = calc_engine.calculate(
+                    [live_cell_counts], [dead_cell_counts],
+                    dilution, total_stock_vol, target_cells, pipette_volume,
+                    num_squares=num_squares_counted
+                )
+            if calc["error"][0]: st.error(calc_engine.error_message(calc, 0)); return False
+            st.session_state.calc_results = calc_engine.result_row(calc, 0)
             return True # 계산 성공
         except Exception as e:
             st.error(f"계산 중 오류가 발생했습니다: {e}"); return False
@@ -131,14 +217,14 @@ with tab1:
     # (v31의 계산 버튼 로직)
     if st.sidebar.button("✨ 계산 실행하기 ✨", type="primary"):
         if perform_calculation():
-            st.session_state.calculation_done = True
+            st.session_state.calc_done = True
         else:
-            st.session_state.calculation_done = False
-            if "results" in st.session_state: del st.session_state.results
+            st.session_state.calc_done = False
+            if "calc_results" in st.session_state: del st.session_state.calc_results
 
     # (v31의 결과 및 일지 기록 폼)
-    if st.session_state.get("calculation_done", False) and "results" in st.session_state:
-        results = st.session_state.results
+    if st.session_state.get("calc_done", False) and "calc_results" in st.session_state:
+        results = st.session_state.calc_results
         
         # (결과 출력 1, 2, 3 생략 - v31과 동일)
         st.header("🔬 계산 결과")
@@ -169,7 +255,7 @@ with tab1:
         st.divider()
         st.subheader("✍️ 이 작업을 배양 일지에 기록합니다")
 
-        with st.form(key="log_form"):
+        with st.form(key="calc_log_form"):
             st.write("**일지 정보 입력**") 
             cell_name = st.text_input("세포 이름 (Cell Line ID):")
             passage_num = st.number_input("계대 배수 (Passage No.):", min_value=0, step=1)
@@ -182,97 +268,136 @@ with tab1:
             st.write("---")
             notes = st.text_area("특이사항 (Notes):")
             
-            submit_button = st.form_submit_button(label="일지 저장하기", type="primary")
+            # 저장 버튼은 Google 인증이 끝난 뒤에 켜집니다.
+            submit_button = st.form_submit_button(label="일지 저장하기", type="primary", disabled=outbox is None)
+            if outbox is None:
+                st.caption(auth_error_msg or "⏳ Google Sheets 연결 중입니다. 연결되면 저장할 수 있습니다.")
 
             if submit_button:
                 try:
-                    sh = client.open(SHEET_FILE_NAME)
-                    sheet = sh.worksheet(SHEET_TAB_NAME)
-                    
-                    log_data_list = [
-                        datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                        cell_name, int(passage_num),
-                        ", ".join(operators_list), # 쉼표로 구분된 텍스트로 저장
-                        notes, f"{results['viability']:.2f}",
-                        int(results['total_live_cells_counted']), int(results['total_dead_cells_counted']),
-                        f"{results['cells_per_ml']:.2e}", f"{results['total_live_cells_in_tube']:.2e}",
-                        float(results['total_stock_vol']), f"{results['target_cells']:.2e}",
-                        float(results['pipette_volume']), f"{results['media_to_add']:.3f}",
-                        f"{results['total_working_volume']:.3f}", int(results['total_dishes_final'])
-                    ]
+                    from log_schema import TIMESTAMP_FORMAT, format_log_row
+                    # 숫자 컬럼의 저장 형식(.2e / .3f 등)은 log_schema 에서 정합니다.
+                    log_data_list = format_log_row({
+                        "Timestamp": datetime.now().strftime(TIMESTAMP_FORMAT),
+                        "Cell_Name": cell_name, "Passage_No": int(passage_num),
+                        "Operators": ", ".join(operators_list), # 쉼표로 구분된 텍스트로 저장
+                        "Notes": notes,
+                        **calc_engine.named_row(results)
+                    })
                     
-                    sheet.append_row(log_data_list)
+                    # 시트에 바로 쓰지 않고 로컬 대기열에 넣습니다. (백그라운드에서 묶어서 전송)
+                    with METRICS.span("save.enqueue"):
+                        outbox.put(log_data_list)
                     st.success(f"✅ 일지 저장 완료! (Cell: {cell_name}, P:{passage_num})")
-                    st.info("로그 조회 탭을 확인하세요 (새로고침 필요).")
+                    st.info("일지는 잠시 후 Google Sheet와 로그 조회 탭에 반영됩니다.")
                     
-                    st.cache_data.clear() 
-                    st.cache_resource.clear() 
-                    st.session_state.calculation_done = False
-                    del st.session_state.results
+                    # 캐시를 지우지 않습니다: 전송이 끝나면 로컬 사본에 바로 추가되고 데이터 버전이 바뀝니다.
+                    st.session_state.calc_done = False
+                    del st.session_state.calc_results
                 
                 except Exception as e:
-                    st.error(f"Google Sheet 저장 실패: {e}")
+                    st.error(f"일지 저장 실패: {e}")
     else:
         st.info("왼쪽 사이드바에서 값을 입력하고 '계산 실행하기' 버튼을 눌러주세요.")
 
+    # (일괄 가져오기) 자동 계수기 내보내기 파일을 나눠 읽고 계산해서 저장 대기열에 넣습니다.
+    st.divider()
+    with st.expander("📥 자동 계수기 파일 일괄 가져오기 (CSV / XLSX)"):
+        st.caption(
+            "필수 컬럼: Cell_Name, 그리고 Live_1..Live_9 / Dead_1..Dead_9 (칸별 계수) 또는 "
+            "Counted_Total_Live / Counted_Total_Dead + Num_Squares (합계). "
+            "선택 컬럼: Passage_No, Operators, Notes, Timestamp, Dilution, Stock_Volume_ml, "
+            "Target_Cells_per_Dish, Seeding_Volume_per_Dish_ml (없으면 계산기 기본값)"
+        )
+        uploaded_file = st.file_uploader("파일 선택", type=["csv", "xlsx"], key="calc_bulk_file")
+        if uploaded_file is not None and st.button("일괄 가져오기", key="calc_bulk_import", disabled=outbox is None):
+            import pandas as pd
+            import bulk_import
+            progress_bar = st.empty()
+            progress_bar.caption("⏳ 가져오는 중...")
 
-# --- 5. 탭 2: 로그 조회 (v32 수정됨) ---
-with tab2:
+            def show_progress(n_rows, fraction):
+                if fraction is None: # XLSX: 진행률을 알 수 없으므로 처리한 행 수만 표시
+                    progress_bar.caption(f"⏳ {n_rows}행 처리 중... (XLSX 파일은 진행률을 알 수 없습니다)")
+                else:
+                    progress_bar.progress(fraction, text=f"{n_rows}행 처리 중...")
+
+            try:
+                with METRICS.span("bulk_import"):
+                    result = bulk_import.import_file(uploaded_file, uploaded_file.name, outbox.put_many,
+                                                     progress=show_progress)
+            except Exception as e:
+                st.error(f"일괄 가져오기 실패: {e}")
+            else:
+                progress_bar.progress(1.0, text=f"{result['rows']}행 처리 완료")
+                st.success(f"✅ {result['imported']}건을 저장했습니다. 잠시 후 Google Sheet와 로그 조회 탭에 반영됩니다.")
+                if result["n_errors"]:
+                    st.warning(f"{result['n_errors']}행은 오류로 건너뛰었습니다. (처음 {len(result['errors'])}건 표시)")
+                    st.dataframe(pd.DataFrame(result["errors"], columns=["행 번호", "사유"]), hide_index=True)
+
+with tab1:
+    calculator_tab()
+
+
+# --- 5. 탭 2: 로그 조회 (로컬 사본에서 조회) ---
+@st.fragment
+@METRICS.run("log_view", on_end=save_run_metrics)
+def log_view_tab():
     st.header("📊 배양 일지 로그 조회")
+    if client is None:
+        if auth_error_msg:
+            st.error(f"{auth_error_msg} - 로그를 조회할 수 없습니다.")
+        else:
+            st.info("⏳ Google Sheets 연결 중... 연결되면 로그가 표시됩니다.")
+        return
+    import pandas as pd
+    import log_charts
+    from log_schema import TIMESTAMP_FORMAT
     
-    # (B) 데이터 로드 (v31과 동일)
-    df, data_error_msg = load_data(client) # 캐시된 데이터 사용
+    # (B) 데이터 동기화 (시트 -> 로컬 사본)
+    mirror = get_log_mirror()
+    METRICS.inc("cache_calls.load_data")
+    data_error_msg = load_data(client, st.session_state.pop("log_refresh_full", False)) # 캐시된 동기화 결과 사용
+    data_version = mirror.version # 저장/동기화로 데이터가 바뀔 때만 증가
 
-    # (C) 새로고침 버튼 (v31과 동일)
-    if st.button("새로고침 (Refresh Data)"):
-        st.cache_data.clear() # 데이터 캐시 지우기
-        st.cache_resource.clear() # 인증 캐시 지우기
-        st.rerun() # 앱 재실행
+    # (C) 새로고침 버튼
+    if st.button("새로고침 (Refresh Data)", key="log_refresh"):
+        load_data.clear() # 동기화 캐시만 지우기 (인증, 차트 캐시는 유지)
+        st.session_state["log_refresh_full"] = True # 시트 전체를 다시 읽기 (수정된 행까지 반영)
+        st.rerun(scope="fragment") # 로그 조회만 다시 실행
 
-    if data_error_msg:
+    with METRICS.span("log.count"):
+        total_rows = mirror.count()
+    if data_error_msg and total_rows:
+        st.warning(f"{data_error_msg} (마지막으로 동기화된 로컬 사본을 표시합니다)")
+    if data_error_msg and not total_rows:
         st.error(data_error_msg)
-    elif df.empty:
+    elif total_rows == 0:
         st.warning("아직 저장된 로그가 없습니다. '계산기' 탭에서 일지를 저장하세요.")
     else:
-        # --- (D) 데이터 전처리 (v31과 동일) ---
-        df_display = df.copy()
-        try:
-            if 'Timestamp' in df_display.columns:
-                df_display['Timestamp'] = pd.to_datetime(df_display['Timestamp'])
-            if 'Viability_Percent' in df_display.columns:
-                df_display['Viability_Percent'] = pd.to_numeric(df_display['Viability_Percent'], errors='coerce')
-            if 'Passage_No' in df_display.columns:
-                df_display['Passage_No'] = pd.to_numeric(df_display['Passage_No'], errors='coerce')
-            if 'Total_Live_Cells_in_Tube' in df_display.columns:
-                df_display['Total_Live_Cells_in_Tube'] = pd.to_numeric(df_display['Total_Live_Cells_in_Tube'], errors='coerce')
-            if 'Total_Dishes_Made' in df_display.columns:
-                df_display['Total_Dishes_Made'] = pd.to_numeric(df_display['Total_Dishes_Made'], errors='coerce')
-            if 'Operators' in df_display.columns:
-                df_display['Operators'] = df_display['Operators'].astype(str) 
-            if 'Cell_Name' in df_display.columns:
-                df_display['Cell_Name'] = df_display['Cell_Name'].astype(str)
-        except Exception as e:
-            st.warning(f"데이터 타입 변환 중 오류: {e} (일부 필터가 작동하지 않을 수 있습니다)")
-
-        # --- (E) 필터 (v31과 동일) ---
+        # --- (E) 필터 (선택지/범위는 데이터 버전마다 한 번만 조회) ---
         st.subheader("필터")
+        with METRICS.span("log.options"):
+            filter_options = mirror.options()
         
         # 1. 세포 이름 필터 
-        if 'Cell_Name' in df_display.columns:
-            all_cell_names = sorted(df_display['Cell_Name'].dropna().unique())
+        if 'Cell_Name' in mirror.columns:
+            all_cell_names = filter_options["cells"]
             selected_cells = st.multiselect(
                 "세포 이름 (Cell Name) 필터:",
                 options=all_cell_names,
-                default=list(all_cell_names) 
+                default=list(all_cell_names)
             )
         else:
             st.info("'Cell_Name' 컬럼이 시트에 없습니다. (헤더 확인)")
             selected_cells = []
 
         # 2. 날짜 범위 필터
-        if 'Timestamp' in df_display.columns and not df_display['Timestamp'].isnull().all():
-            min_date = df_display['Timestamp'].min().date()
-            max_date = df_display['Timestamp'].max().date()
+        ts_bounds = filter_options["bounds"]["Timestamp"]
+        ts_min, ts_max = (pd.to_datetime(v, errors='coerce') for v in ts_bounds)
+        if not pd.isnull(ts_min) and not pd.isnull(ts_max):
+            min_date = ts_min.date()
+            max_date = ts_max.date()
             selected_date_range = st.date_input(
                 "날짜 범위 (Date Range) 필터:",
                 value=(min_date, max_date),
@@ -285,25 +410,22 @@ with tab2:
             selected_date_range = None
 
         # 3. 작업자 필터
-        if 'Operators' in df_display.columns:
-            all_operators = set()
-            for op_list in df_display['Operators'].dropna():
-                operators = [op.strip() for op in op_list.split(',') if op.strip()]
-                all_operators.update(operators)
-            sorted_operators = sorted(list(all_operators))
+        if 'Operators' in mirror.columns:
+            sorted_operators = filter_options["operators"] # 작업자별로 펼친 인덱스에서 조회
             selected_operators = st.multiselect(
                 "작업자 (Operators) 필터:",
                 options=sorted_operators,
-                default=list(sorted_operators) 
+                default=list(sorted_operators)
             )
         else:
             st.info("'Operators' 컬럼이 시트에 없습니다.")
             selected_operators = []
 
         # 4. 계대 배수(P#) 필터
-        if 'Passage_No' in df_display.columns and not df_display['Passage_No'].isnull().all():
-            min_p = int(df_display['Passage_No'].min())
-            max_p = int(df_display['Passage_No'].max())
+        p_bounds = filter_options["bounds"]["Passage_No"]
+        if p_bounds[0] is not None:
+            min_p = int(p_bounds[0])
+            max_p = int(p_bounds[1])
             if min_p == max_p: 
                  selected_p_range = st.slider(
                     "계대 배수 (Passage No.) 범위:",
@@ -319,46 +441,37 @@ with tab2:
             selected_p_range = None
 
         # 5. 생존률(Viability) 필터 (0-100 고정)
-        if 'Viability_Percent' in df_display.columns and not df_display['Viability_Percent'].isnull().all():
+        v_bounds = filter_options["bounds"]["Viability_Percent"]
+        if v_bounds[0] is not None:
             selected_v_range = st.slider(
                 "세포 생존률 (Viability) 범위 (%):",
-                min_value=0.0, max_value=100.0, value=(0.0, 100.0), step=0.1
+                min_value=0.0, max_value=100.0, value=(0.0, 100.0), step=0.1,
+                key="log_viability_range"
             )
         else:
             st.info("'Viability_Percent' 컬럼이 없거나 비어있습니다.")
             selected_v_range = None
 
-        # --- (F) 필터 로직 (v31과 동일) ---
-        df_filtered = df_display.copy()
-        
-        # (필터 로직 생략 - v31과 동일)
-        if 'Cell_Name' in df_filtered.columns and selected_cells:
-            df_filtered = df_filtered[df_filtered['Cell_Name'].isin(selected_cells)]
-        if 'Timestamp' in df_filtered.columns and selected_date_range and len(selected_date_range) == 2:
+        # --- (F) 필터 로직 (모든 필터를 한 번의 SQL 조건으로 처리, 결과 row_no 목록은 mirror 가 LRU 캐시) ---
+        sql_date_range = None
+        if selected_date_range and len(selected_date_range) == 2:
             start_date = pd.to_datetime(selected_date_range[0])
             end_date = pd.to_datetime(selected_date_range[1]).replace(hour=23, minute=59, second=59)
-            df_filtered = df_filtered[(df_filtered['Timestamp'] >= start_date) & (df_filtered['Timestamp'] <= end_date)]
-        if 'Operators' in df_filtered.columns and selected_operators:
-            mask = df_filtered['Operators'].apply(
-                lambda op_string: any(
-                    selected_op in [op.strip() for op in op_string.split(',')]
-                    for selected_op in selected_operators
-                )
-            )
-            df_filtered = df_filtered[mask]
-        if 'Passage_No' in df_filtered.columns and selected_p_range:
-            df_filtered = df_filtered[
-                (df_filtered['Passage_No'] >= selected_p_range[0]) &
-                (df_filtered['Passage_No'] <= selected_p_range[1])
-            ]
-        if 'Viability_Percent' in df_filtered.columns and selected_v_range:
-            df_filtered = df_filtered[
-                (df_filtered['Viability_Percent'] >= selected_v_range[0]) &
-                (df_filtered['Viability_Percent'] <= selected_v_range[1])
-            ]
-
-        # --- (G) 데이터 표시 (v31과 동일) ---
-        st.subheader(f"필터링된 로그 ({len(df_filtered)} / {len(df_display)} 건)")
+            sql_date_range = (start_date.strftime(TIMESTAMP_FORMAT), end_date.strftime(TIMESTAMP_FORMAT))
+        log_filters = {
+            "cells": tuple(selected_cells),
+            "date_range": sql_date_range,
+            "operators": tuple(selected_operators),
+            "passage_range": tuple(selected_p_range) if selected_p_range else None,
+            "viability_range": tuple(selected_v_range) if selected_v_range else None,
+        }
+        filter_key = tuple(log_filters.items()) # 캐시 키로 쓰는 필터 상태
+        with METRICS.span("log.filter"):
+            filtered_rows = mirror.count(**log_filters)
+        # (D) 자료형 변환은 mirror.query()가 log_schema에 따라 한 번에 처리합니다.
+
+        # --- (G) 데이터 표시 (현재 페이지만 조회해서 표시) ---
+        st.subheader(f"필터링된 로그 ({filtered_rows} / {total_rows} 건)")
         columns_order = [
             "Timestamp", "Cell_Name", "Passage_No", "Operators", "Viability_Percent", 
             "Total_Dishes_Made", "Counted_Total_Live", "Counted_Total_Dead", 
@@ -366,79 +479,136 @@ with tab2:
             "Target_Cells_per_Dish", "Seeding_Volume_per_Dish_ml", 
             "Media_to_Add_ml", "Total_Final_Volume_ml", "Notes"
         ]
-        display_cols = [col for col in columns_order if col in df_filtered.columns]
-        st.dataframe(df_filtered[display_cols])
+        display_cols = [col for col in columns_order if col in mirror.columns]
+
+        col1, col2, col3, col4 = st.columns(4)
+        page_size = col1.selectbox("페이지당 행 수:", [25, 50, 100, 250, 500], index=2, key="log_page_size")
+        sort_col = col2.selectbox("정렬 기준:", ["(시트 순서)"] + display_cols, key="log_sort_col")
+        sort_desc = col3.radio("정렬 방향:", ["오름차순", "내림차순"], horizontal=True, key="log_sort_dir") == "내림차순"
+        n_pages = max(1, -(-filtered_rows // page_size))
+        page_no = col4.number_input(f"페이지 (총 {n_pages}쪽):", min_value=1, max_value=n_pages, value=1, step=1)
+
+        with METRICS.span("log.page"):
+            df_page = mirror.query(
+                order_by=None if sort_col == "(시트 순서)" else sort_col,
+                descending=sort_desc,
+                limit=page_size,
+                offset=(int(page_no) - 1) * page_size,
+                **log_filters
+            )
+        with METRICS.span("log.table_render"):
+            st.dataframe(df_page[[col for col in display_cols if col in df_page.columns]])
+
+        # 필터 결과 전체 내보내기 (다운로드 버튼을 누를 때만 만들고, 나눠서 읽고 씀)
+        col1, col2 = st.columns([1, 3])
+        export_format = col1.selectbox("내보내기 형식:", ["CSV", "Parquet"], key="log_export_format")
+
+        def build_export(fmt=export_format.lower(), filters=log_filters):
+            buffer = io.BytesIO()
+            mirror.export(buffer, fmt=fmt, columns=display_cols, **filters)
+            return buffer.getvalue()
+
+        col2.download_button(
+            f"⬇️ 필터링된 로그 {filtered_rows}건 {export_format} 다운로드",
+            data=build_export,
+            file_name=f"cell_culture_log.{export_format.lower()}",
+            mime="text/csv" if export_format == "CSV" else "application/octet-stream",
+        )
         
         st.divider()
 
-        # --- (H) 시각화 (v31과 동일) ---
+        # --- (K) 세포주별 요약 (저장/동기화 때 증분 갱신되는 rollup 테이블에서 바로 읽음) ---
+        st.subheader("세포주별 요약 (계대 이력)")
+        st.caption("세포 이름 필터만 적용됩니다. 배가 시간은 연속된 두 계대의 기록(심은 세포 수 -> 다음 계대의 총 세포 수)으로 어림한 값입니다.")
+        with METRICS.span("log.rollup"):
+            rollup_df = mirror.rollup(cells=selected_cells)
+        if rollup_df.empty:
+            st.info("요약할 데이터가 없습니다. (Cell_Name, Passage_No 컬럼 필요)")
+        else:
+            latest_df = rollup_df.groupby("Cell_Name").tail(1).set_index("Cell_Name")
+            latest_df["Mean_Doubling_Time_h"] = rollup_df.groupby("Cell_Name")["Doubling_Time_h"].mean()
+            st.dataframe(latest_df[["Passage_No", "Latest_Viability", "Viability_Mean", "Viability_Std",
+                                    "Mean_Live_Cells", "Mean_Doubling_Time_h", "Last_Timestamp"]].round(2))
+            with st.expander("계대별 상세"):
+                st.dataframe(rollup_df.round(2), hide_index=True)
+
+        st.divider()
+
+        # --- (H) 시각화 (기간 단위로 집계한 차트 데이터, 데이터 버전/필터별 캐시) ---
+        def chart_hidden_note(chart_df):
+            # 차트에 보내는 점 수 제한(log_charts.MAX_POINTS) 때문에 숨긴 선이 있으면 알려줍니다.
+            hidden = chart_df.attrs.get("hidden_lines", 0)
+            if hidden:
+                st.caption(f"세포 이름이 많아 기록이 많은 {chart_df['Cell_Name'].nunique()}개만 표시합니다. "
+                           f"(숨긴 세포 이름 {hidden}개 - 세포 이름 필터로 좁혀 보세요)")
+
+        chart_bucket = st.radio("차트 집계 단위:", list(log_charts.BUCKETS), horizontal=True, key="log_chart_bucket")
+        try:
+            METRICS.inc("cache_calls.chart_data")
+            chart_data = get_chart_data(data_version, filter_key, log_charts.BUCKETS[chart_bucket])
+        except Exception as e:
+            st.warning(f"차트 데이터 생성 중 오류: {e}")
+            chart_data = {}
+
         st.subheader("Viability (생존률) 추이")
-        if (not df_filtered.empty and 
-            'Viability_Percent' in df_filtered.columns and 
-            'Timestamp' in df_filtered.columns and 
-            'Cell_Name' in df_filtered.columns):
-            
-            try:
-                chart_df = df_filtered.dropna(subset=['Viability_Percent', 'Timestamp', 'Cell_Name'])
-                chart_data = chart_df.pivot_table(
-                    index='Timestamp', 
-                    columns='Cell_Name', 
-                    values='Viability_Percent',
-                    aggfunc='mean'
-                )
-                st.line_chart(chart_data)
-            except Exception as e:
-                st.warning(f"생존률 차트 생성 중 오류: {e}")
+        if 'viability' in chart_data and not chart_data['viability'].empty:
+            with METRICS.span("charts.render"):
+                st.line_chart(chart_data['viability'], x='Timestamp', y='Viability_Percent', color='Cell_Name')
+            chart_hidden_note(chart_data['viability'])
         else:
             st.info("차트를 그릴 데이터가 부족합니다. (Timestamp, Cell_Name, Viability_Percent 컬럼 필요)")
 
         
         st.divider()
 
-        # --- (I) 총 세포 수 추이 (v31과 동일) ---
+        # --- (I) 총 세포 수 추이 ---
         st.subheader("총 보유 세포 수 (Live) 추이")
-        if (not df_filtered.empty and 
-            'Total_Live_Cells_in_Tube' in df_filtered.columns and 
-            'Timestamp' in df_filtered.columns and 
-            'Cell_Name' in df_filtered.columns):
-            
-            try:
-                chart_df_cells = df_filtered.dropna(subset=['Total_Live_Cells_in_Tube', 'Timestamp', 'Cell_Name'])
-                chart_data_cells = chart_df_cells.pivot_table(
-                    index='Timestamp', 
-                    columns='Cell_Name', 
-                    values='Total_Live_Cells_in_Tube',
-                    aggfunc='mean' 
-                )
-                st.line_chart(chart_data_cells)
-            except Exception as e:
-                st.warning(f"총 세포 수 차트 생성 중 오류: {e}")
+        if 'live_cells' in chart_data and not chart_data['live_cells'].empty:
+            with METRICS.span("charts.render"):
+                st.line_chart(chart_data['live_cells'], x='Timestamp', y='Total_Live_Cells_in_Tube', color='Cell_Name')
+            chart_hidden_note(chart_data['live_cells'])
         else:
             st.info("차트를 그릴 데이터가 부족합니다. (Timestamp, Cell_Name, Total_Live_Cells_in_Tube 컬럼 필요)")
 
         st.divider()
 
-        # --- (J) 총 배양접시 수 추이 (v32 수정됨) ---
-        
-        # ▼▼▼ [수정됨] v32: "(Made)" 제거 ▼▼▼
+        # --- (J) 총 배양접시 수 추이 ---
         st.subheader("총 배양접시 수 추이")
-        
-        if (not df_filtered.empty and 
-            'Total_Dishes_Made' in df_filtered.columns and 
-            'Timestamp' in df_filtered.columns and 
-            'Cell_Name' in df_filtered.columns):
-            
-            try:
-                chart_df_dishes = df_filtered.dropna(subset=['Total_Dishes_Made', 'Timestamp', 'Cell_Name'])
-                chart_data_dishes = chart_df_dishes.pivot_table(
-                    index='Timestamp', 
-                    columns='Cell_Name', 
-                    values='Total_Dishes_Made',
-                    aggfunc='sum' # 같은 날짜/세포의 접시 수는 합산
-                )
-                st.line_chart(chart_data_dishes)
-            except Exception as e:
-                st.warning(f"총 배양접시 수 차트 생성 중 오류: {e}")
+        if 'dishes' in chart_data and not chart_data['dishes'].empty:
+            with METRICS.span("charts.render"):
+                st.line_chart(chart_data['dishes'], x='Timestamp', y='Total_Dishes_Made', color='Cell_Name')
+            chart_hidden_note(chart_data['dishes'])
         else:
             st.info("차트를 그릴 데이터가 부족합니다. (Timestamp, Cell_Name, Total_Dishes_Made 컬럼 필요)")
-        # ▲▲▲ [수정됨] v32 끝 ▲▲▲
+
+with tab2:
+    log_view_tab()
+
+
+# --- 6. 성능 기록 (구간별 소요 시간, 캐시/Sheets API 카운터) ---
+# (fragment만 다시 실행될 때는 각 fragment가 자기 실행을 따로 기록합니다)
+run_metrics = METRICS.end_run()
+save_run_metrics(run_metrics)
+
+if st.sidebar.checkbox("🔧 성능 디버그 패널", value=False):
+    import pandas as pd
+    with st.sidebar.expander("이번 실행", expanded=True):
+        st.write(f"총 {run_metrics['total_s'] * 1000:.1f} ms")
+        if run_metrics["spans"]:
+            spans_df = pd.DataFrame(run_metrics["spans"])
+            spans_df = spans_df.groupby("name", sort=False)["seconds"].agg(["count", "sum"])
+            st.dataframe((spans_df.assign(ms=spans_df["sum"] * 1000)[["count", "ms"]]).round(2))
+    counters, timings = METRICS.snapshot()
+    with st.sidebar.expander("누적 통계 (프로세스 시작 이후)"):
+        for name in ("gspread_client", "load_data", "chart_data", "log_filter"):
+            calls = counters.get(f"cache_calls.{name}", 0)
+            misses = counters.get(f"cache_misses.{name}", 0)
+            st.write(f"캐시 {name}: 적중 {max(calls - misses, 0)} / 실패 {misses}")
+        st.write(f"Sheets API 호출: {counters.get('sheets_api_calls', 0)}회, "
+                 f"{counters.get('sheets_api_bytes', 0) / 1024:.1f} KB "
+                 f"(429 제한 {counters.get('sheets_api_rate_limited', 0)}회)")
+        timings_df = pd.DataFrame(
+            [(k, v[0], v[1] / v[0] * 1000, v[2] * 1000) for k, v in timings.items()],
+            columns=["구간", "횟수", "평균 ms", "최대 ms"]
+        ).set_index("구간")
+        st.dataframe(timings_df.round(2))
@@ -0,0 +1,95 @@
+# 로그 조회 탭의 추이 차트 데이터
+# - 생존률 / 총 세포 수 / 배양접시 수를 (기간 단위, 세포 이름)으로 한 번에 집계합니다.
+# - 기간이 길면 세포 이름별로 LTTB 다운샘플링을 적용해 차트에 보내는 점의 수를 MAX_POINTS 이하로 제한합니다.
+#   선 하나에 MIN_POINTS_PER_LINE 개는 남겨야 모양이 보이므로, 세포 이름이 많으면 점이 많은 순서로
+#   MAX_POINTS // MIN_POINTS_PER_LINE 개의 선만 그립니다. (숨긴 선 수는 DataFrame.attrs["hidden_lines"])
+import numpy as np
+import pandas as pd
+
+# 화면에 표시하는 이름 -> pandas 기간 단위
+BUCKETS = {"일": "D", "주": "W", "월": "M"}
+
+# 차트 이름 -> (컬럼, 집계 방식)
+CHART_SERIES = {
+    "viability": ("Viability_Percent", "mean"),
+    "live_cells": ("Total_Live_Cells_in_Tube", "mean"),
+    "dishes": ("Total_Dishes_Made", "sum"),   # 같은 기간/세포의 접시 수는 합산
+}
+
+MAX_POINTS = 1000         # 차트 하나에 보내는 점의 최대 개수 (모든 세포 이름 합계)
+MIN_POINTS_PER_LINE = 50  # 선 하나에 남기는 최소 점 수 (그릴 수 있는 선 수 = MAX_POINTS // 이 값)
+
+
+def lttb(x, y, n_out):
+    # Largest-Triangle-Three-Buckets: 모양을 유지하면서 n_out개의 점만 고릅니다. (선택한 위치 반환)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    picked = np.empty(n_out, dtype=int)
+    picked[0], picked[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], max(edges[i + 1], edges[i] + 1)
+        if i == n_out - 3:
+            avg_x, avg_y = x[-1], y[-1]
+        else:
+            nxt = slice(end, max(edges[i + 2], end + 1))
+            avg_x, avg_y = x[nxt].mean(), y[nxt].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        picked[i + 1] = a
+    return picked
+
+
+def _downsample(long_df, value_col, max_points):
+    # 모든 선을 합쳐 max_points 개 이하로 줄입니다.
+    sizes = long_df["Cell_Name"].value_counts()
+    max_lines = max(1, max_points // MIN_POINTS_PER_LINE)
+    hidden = max(0, len(sizes) - max_lines)
+    if len(long_df) > max_points and hidden:
+        # 선이 너무 많으면 점이 많은 세포 이름만 남깁니다. (나머지는 세포 이름 필터로 좁혀서 봄)
+        sizes = sizes.iloc[:max_lines]
+        long_df = long_df[long_df["Cell_Name"].isin(sizes.index)]
+    else:
+        hidden = 0
+    if len(long_df) > max_points:
+        per_line = max_points // len(sizes)
+        parts = []
+        for _, line in long_df.groupby("Cell_Name", observed=True, sort=False):
+            keep = lttb(line["Timestamp"].to_numpy(dtype="datetime64[ns]").astype("int64"),
+                        line[value_col].to_numpy(dtype=float), per_line)
+            parts.append(line.iloc[keep])
+        long_df = pd.concat(parts, ignore_index=True)
+    long_df = long_df.reset_index(drop=True)
+    long_df.attrs["hidden_lines"] = hidden
+    return long_df
+
+
+def chart_series(df, bucket="D", max_points=MAX_POINTS):
+    # 차트 이름 -> long 형식 DataFrame (Timestamp, Cell_Name, 값 컬럼)
+    columns = [c for c, _ in CHART_SERIES.values() if c in df.columns]
+    if df.empty or not columns or "Timestamp" not in df.columns or "Cell_Name" not in df.columns:
+        return {}
+    data = df.dropna(subset=["Timestamp", "Cell_Name"])
+    period = data["Timestamp"].dt.to_period(bucket).dt.start_time.rename("Timestamp")
+
+    # 세 가지 값을 한 번의 groupby로 집계합니다. (합계는 값이 하나도 없는 칸을 빈 칸으로 둠)
+    agg = {}
+    for name, (column, how) in CHART_SERIES.items():
+        if column in columns:
+            agg[name] = (column, how)
+            agg[f"{name}__n"] = (column, "count")
+    grouped = data.groupby([period, data["Cell_Name"]], observed=True).agg(**agg)
+
+    out = {}
+    for name, (column, _) in CHART_SERIES.items():
+        if name not in grouped.columns:
+            continue
+        values = grouped[name].where(grouped[f"{name}__n"] > 0).dropna()
+        long_df = values.rename(column).reset_index()
+        long_df["Cell_Name"] = long_df["Cell_Name"].astype(str)
+        out[name] = _downsample(long_df, column, max_points)
+    return out
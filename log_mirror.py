@@ -0,0 +1,319 @@
+# 'Log' 워크시트의 로컬 SQLite 사본 (로그 조회 탭의 읽기 경로)
+# - sheet_log.LogSync 의 증분 동기화로 시트와 맞추고, 상태(헤더/행 수)도 함께 저장하므로
+#   앱을 다시 시작해도 새 행만 가져옵니다.
+# - Timestamp, Cell_Name, Operators, Passage_No 에 인덱스를 두고 필터를 SQL로 처리합니다.
+# - 쉼표로 묶인 Operators 는 (operator, row_no) 로 펼친 log_operator 테이블에도 저장해
+#   작업자 선택지와 작업자 필터를 인덱스 조회로 처리합니다.
+# - 시트가 느리거나 연결되지 않아도 마지막으로 동기화된 데이터로 조회할 수 있습니다.
+# - 세포주 x 계대별 요약(rollup 테이블, log_rollup)을 행을 넣을 때마다 함께 갱신합니다.
+# - 필터 선택지/범위는 데이터 버전마다 한 번만 조회하고, 필터 결과(row_no 목록)는
+#   (데이터 버전, 필터, 정렬) 키로 최근 RESULT_CACHE_SIZE 개를 보관합니다. (LRU)
+#   자주 쓰는 필터 사이를 오가면 건수와 페이지를 기본 키 조회만으로 돌려줍니다.
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import log_rollup
+from log_schema import TIMESTAMP_FORMAT, apply_schema, is_numeric, parse_timestamps, sqlite_type
+from metrics import METRICS
+from sheet_log import LogSync, _pad
+
+INDEXED_COLUMNS = ["Timestamp", "Cell_Name", "Operators", "Passage_No"]
+SCHEMA_VERSION = 4   # 테이블 구조가 바뀌면 올립니다. (기존 사본은 전체 재동기화)
+RESULT_CACHE_SIZE = 32   # 보관하는 필터 결과 수
+RANGE_COLUMNS = ["Timestamp", "Passage_No", "Viability_Percent"]
+
+
+def _sql_columns(header):
+    # 빈 헤더/중복 헤더도 SQLite 컬럼 이름으로 쓸 수 있게 정리합니다.
+    columns = []
+    for i, name in enumerate(header):
+        name = str(name).strip().replace('"', "") or f"column_{i + 1}"
+        base, n = name, 2
+        while name in columns:
+            name = f"{base}_{n}"
+            n += 1
+        columns.append(name)
+    return columns
+
+
+class LogMirror(LogSync):
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self.columns = []
+        self._options = (None, None)        # (데이터 버전, 선택지/범위)
+        self._results = OrderedDict()       # (데이터 버전, 필터, 정렬) -> row_no 목록
+        self._results_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            state = {k: json.loads(v) for k, v in conn.execute("SELECT key, value FROM meta")}
+        if state.get("header") is not None and state.get("schema") == SCHEMA_VERSION:
+            self.header = state["header"]
+            self.n_rows = state["n_rows"]
+            self.last_raw = state["last_raw"]
+            self.version = state["version"]
+            self.columns = _sql_columns(self.header)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    # --- LogSync 보관 방식 ---
+    def _replace(self, rows):
+        # 다른 세션이 조회 중이어도 예전 테이블 또는 새 테이블 전체만 보이도록 한 트랜잭션으로 바꿉니다.
+        # (sqlite3 모듈은 DDL 앞에서는 트랜잭션을 시작하지 않으므로 BEGIN 을 직접 실행)
+        columns = _sql_columns(self.header)
+        with self._connect() as conn:
+            conn.execute("BEGIN")
+            conn.execute("DROP TABLE IF EXISTS log")
+            conn.execute("DROP TABLE IF EXISTS log_operator")
+            conn.execute("DROP TABLE IF EXISTS rollup")
+            conn.execute(
+                "CREATE TABLE log_operator (operator TEXT NOT NULL, row_no INTEGER NOT NULL,"
+                " PRIMARY KEY (operator, row_no)) WITHOUT ROWID"
+            )
+            conn.execute(log_rollup.CREATE_SQL)
+            if columns:
+                cols_sql = ", ".join(f'"{c}" {sqlite_type(c)}' for c in columns)
+                conn.execute(f"CREATE TABLE log (row_no INTEGER PRIMARY KEY, {cols_sql})")
+                for c in INDEXED_COLUMNS:
+                    if c in columns:
+                        conn.execute(f'CREATE INDEX "idx_log_{c}" ON log ("{c}")')
+                self._insert(conn, rows, 0, columns)
+        self.columns = columns   # 커밋한 뒤에 바꿔야 다른 세션이 아직 없는 테이블을 조회하지 않음
+
+    def _append(self, rows):
+        with self._connect() as conn:
+            self._insert(conn, rows, self.n_rows)
+
+    def _insert(self, conn, rows, offset, columns=None):
+        if not rows:
+            return
+        columns = columns or self.columns
+        df = pd.DataFrame([_pad(r, len(columns)) for r in rows], columns=columns)
+        for c in df.columns:
+            if is_numeric(c):
+                df[c] = pd.to_numeric(df[c], errors="coerce")
+            elif c == "Timestamp":
+                # 형식을 통일해 두어야 문자열 비교로 날짜 범위 조회가 가능합니다. (읽을 수 없는 값은 NULL)
+                parsed = parse_timestamps(df[c])
+                df[c] = parsed.dt.strftime(TIMESTAMP_FORMAT).where(parsed.notna(), None)
+        self._update_rollup(conn, log_rollup.batch_stats(df))
+        df = df.astype(object).where(df.notna(), None)
+        df.insert(0, "row_no", range(offset + 1, offset + 1 + len(df)))
+        placeholders = ", ".join("?" * len(df.columns))
+        conn.executemany(f"INSERT INTO log VALUES ({placeholders})", df.itertuples(index=False, name=None))
+
+        if "Operators" in df.columns:
+            ops = df.set_index("row_no")["Operators"].dropna().astype(str).str.split(",").explode().str.strip()
+            ops = ops[ops != ""]
+            conn.executemany(
+                "INSERT OR IGNORE INTO log_operator (operator, row_no) VALUES (?, ?)",
+                zip(ops.tolist(), ops.index.tolist()),
+            )
+
+    def _update_rollup(self, conn, stats):
+        # 새 행들의 요약을 같은 키의 기존 요약과 합쳐서 덮어씁니다.
+        if stats.empty:
+            return
+        cells = stats["cell_name"].unique().tolist()
+        old = pd.read_sql_query(
+            f'SELECT * FROM rollup WHERE cell_name IN ({", ".join("?" * len(cells))})', conn, params=cells
+        )
+        merged = log_rollup.merge(old, stats)
+        merged = merged.astype(object).where(merged.notna(), None)
+        placeholders = ", ".join("?" * len(merged.columns))
+        conn.executemany(f"INSERT OR REPLACE INTO rollup ({', '.join(merged.columns)}) VALUES ({placeholders})",
+                         merged.itertuples(index=False, name=None))
+
+    def _rebuild_rollup(self, conn, chunksize=50000):
+        # 행이 지워졌을 때만 씁니다. (요약에서 행을 뺄 수는 없으므로 로그 전체에서 다시 만듦)
+        conn.execute("DELETE FROM rollup")
+        if not self.columns:
+            return
+        for chunk in pd.read_sql_query("SELECT * FROM log ORDER BY row_no", conn, chunksize=chunksize):
+            self._update_rollup(conn, log_rollup.batch_stats(chunk))
+
+    def _meta_items(self):
+        state = {"header": self.header, "n_rows": self.n_rows, "last_raw": self.last_raw,
+                 "version": self.version, "schema": SCHEMA_VERSION}
+        return [(k, json.dumps(v, ensure_ascii=False)) for k, v in state.items()]
+
+    def _save_state(self):
+        with self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", self._meta_items())
+
+    # --- 조회 ---
+    def distinct(self, column):
+        with self._connect() as conn:
+            return [v for (v,) in conn.execute(
+                f'SELECT DISTINCT "{column}" FROM log WHERE "{column}" IS NOT NULL ORDER BY "{column}"'
+            )]
+
+    def bounds(self, column):
+        with self._connect() as conn:
+            return conn.execute(
+                f'SELECT MIN("{column}"), MAX("{column}") FROM log WHERE "{column}" IS NOT NULL'
+            ).fetchone()
+
+    def operators(self):
+        with self._connect() as conn:
+            return [v for (v,) in conn.execute("SELECT DISTINCT operator FROM log_operator ORDER BY operator")]
+
+    def rollup(self, cells=None):
+        # 세포주 x 계대별 요약 표 (log_rollup.summarize), 세포 이름으로 거를 수 있습니다.
+        sql, params = "SELECT * FROM rollup", []
+        if cells:
+            sql += f' WHERE cell_name IN ({", ".join("?" * len(cells))})'
+            params = [str(c) for c in cells]
+        with self._connect() as conn:
+            return log_rollup.summarize(pd.read_sql_query(sql, conn, params=params))
+
+    def options(self):
+        # 필터 선택지와 범위 {"cells", "operators", "bounds": {컬럼: (최솟값, 최댓값)}}
+        # 데이터 버전이 그대로면 다시 조회하지 않습니다.
+        version, options = self._options
+        if version == self.version and options is not None:
+            return options
+        version = self.version
+        options = {"cells": [], "operators": [], "bounds": {c: (None, None) for c in RANGE_COLUMNS}}
+        if self.columns:
+            if "Cell_Name" in self.columns:
+                options["cells"] = [str(c) for c in self.distinct("Cell_Name")]
+            if "Operators" in self.columns:
+                options["operators"] = self.operators()
+            for column in RANGE_COLUMNS:
+                if column in self.columns:
+                    options["bounds"][column] = self.bounds(column)
+        self._options = (version, options)
+        return options
+
+    @staticmethod
+    def _filter_key(cells=None, date_range=None, operators=None, passage_range=None,
+                    viability_range=None):
+        # 필터 값을 캐시 키로 쓸 수 있게 정리합니다. (목록은 순서와 무관하게 같은 키)
+        def as_range(value):
+            return tuple(value) if value else None
+        return (tuple(sorted(str(c) for c in cells)) if cells else None,
+                as_range(date_range),
+                tuple(sorted(operators)) if operators else None,
+                as_range(passage_range),
+                as_range(viability_range))
+
+    def _where(self, cells=None, date_range=None, operators=None, passage_range=None,
+               viability_range=None):
+        # date_range: (시작, 끝) 'YYYY-MM-DD HH:MM:SS' 문자열, 양 끝 포함
+        # operators: 선택한 작업자 중 한 명이라도 포함된 행
+        where, params = [], []
+        if cells:
+            where.append(f'"Cell_Name" IN ({", ".join("?" * len(cells))})')
+            params += [str(c) for c in cells]
+        if operators:
+            where.append(
+                "row_no IN (SELECT row_no FROM log_operator"
+                f' WHERE operator IN ({", ".join("?" * len(operators))}))'
+            )
+            params += list(operators)
+        for column, value_range in (("Timestamp", date_range),
+                                    ("Passage_No", passage_range),
+                                    ("Viability_Percent", viability_range)):
+            if value_range:
+                where.append(f'"{column}" BETWEEN ? AND ?')
+                params += list(value_range)
+        return (" WHERE " + " AND ".join(where) if where else ""), params
+
+    def row_ids(self, order_by=None, descending=False, **filters):
+        # 필터에 맞는 행의 row_no 목록 (정렬 순서대로). 모든 필터를 SQL 조건 하나로 묶어 한 번에 조회하고,
+        # 결과는 최근 RESULT_CACHE_SIZE 개까지 보관합니다.
+        if not self.columns:
+            return np.empty(0, dtype=np.int64)
+        version = self.version
+        if order_by not in self.columns:
+            order_by = None
+        key = (version, self._filter_key(**filters), order_by, bool(order_by) and descending)
+        METRICS.inc("cache_calls.log_filter")
+        with self._results_lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
+        METRICS.inc("cache_misses.log_filter")
+        sql, params = self._select(order_by, descending, **filters)
+        with self._connect() as conn:
+            cursor = conn.execute(sql.replace("SELECT *", "SELECT row_no", 1), params)
+            ids = np.fromiter((row_no for (row_no,) in cursor), dtype=np.int64)   # 행당 8바이트
+        with self._results_lock:
+            for stale in [k for k in self._results if k[0] != version]:
+                del self._results[stale]   # 이전 데이터 버전의 결과는 다시 쓰이지 않음
+            self._results[key] = ids
+            while len(self._results) > RESULT_CACHE_SIZE:
+                self._results.popitem(last=False)
+        return ids
+
+    def count(self, **filters):
+        return len(self.row_ids(**filters))
+
+    def _select(self, order_by=None, descending=False, **filters):
+        where, params = self._where(**filters)
+        direction = "DESC" if descending else "ASC"
+        order = f"row_no {direction}"
+        if order_by in self.columns:
+            order = f'"{order_by}" {direction}, ' + order
+        return f"SELECT * FROM log{where} ORDER BY {order}", params
+
+    def query(self, order_by=None, descending=False, limit=None, offset=0, **filters):
+        # 필터에 맞는 행 (order_by 컬럼 기준 정렬, limit/offset 으로 한 페이지만 가져오기)
+        # 한 페이지만 가져올 때는 캐시된 row_no 목록을 잘라서 기본 키로 조회합니다.
+        if not self.columns:
+            return pd.DataFrame()
+        if limit is not None:
+            ids = self.row_ids(order_by, descending, **filters)[int(offset):int(offset) + int(limit)].tolist()
+            sql = f'SELECT * FROM log WHERE row_no IN ({", ".join("?" * len(ids))})'
+            with self._connect() as conn:
+                df = pd.read_sql_query(sql, conn, params=ids, index_col="row_no")
+            # 결과 목록의 순서대로 (조회 사이에 지워진 행은 빠짐)
+            return apply_schema(df.loc[[i for i in ids if i in df.index]])
+        sql, params = self._select(order_by, descending, **filters)
+        with self._connect() as conn:
+            df = pd.read_sql_query(sql, conn, params=params, index_col="row_no")
+        return apply_schema(df)
+
+    def iter_chunks(self, chunksize=50000, order_by=None, descending=False, **filters):
+        # 필터 결과 전체를 chunksize 행씩 나눠서 읽습니다. (메모리 사용량 제한)
+        if not self.columns:
+            return
+        sql, params = self._select(order_by, descending, **filters)
+        with self._connect() as conn:
+            for chunk in pd.read_sql_query(sql, conn, params=params, index_col="row_no",
+                                           chunksize=chunksize):
+                yield apply_schema(chunk)
+
+    def export(self, fileobj, fmt="csv", columns=None, chunksize=50000, **filters):
+        # 필터 결과 전체를 CSV 또는 Parquet 으로 fileobj(바이너리)에 나눠서 씁니다. 행 수를 반환.
+        writer = None
+        n = 0
+        try:
+            for chunk in self.iter_chunks(chunksize, **filters):
+                if columns:
+                    chunk = chunk[[c for c in columns if c in chunk.columns]]
+                # 청크마다 범주가 달라지므로 범주형은 문자열로 내보냅니다.
+                chunk = chunk.astype({c: "string" for c in chunk.columns
+                                      if isinstance(chunk[c].dtype, pd.CategoricalDtype)})
+                if fmt == "parquet":
+                    import pyarrow as pa
+                    import pyarrow.parquet as pq
+                    table = pa.Table.from_pandas(chunk, preserve_index=False)
+                    if writer is None:
+                        writer = pq.ParquetWriter(fileobj, table.schema)
+                    writer.write_table(table.cast(writer.schema))
+                else:
+                    fileobj.write(chunk.to_csv(index=False, header=(n == 0)).encode("utf-8"))
+                n += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+        return n
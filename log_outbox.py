@@ -0,0 +1,196 @@
+# 일지 저장 대기열 (write-behind outbox)
+# - 저장 버튼은 로컬 SQLite에 행을 즉시 기록하고 돌아옵니다.
+# - 백그라운드 스레드가 대기 중인 행을 append_rows로 묶어서 시트에 보내고,
+#   실패하면 지수 백오프 후 다시 시도합니다. (시트 반영 후 대기열에서 삭제)
+# - 시트가 거부한 요청(429 제외 4xx)은 행마다 시도 횟수를 세고, 실패한 적 있는 행은 한 행씩 보내서
+#   문제 행만 골라냅니다. max_attempts 번 거부된 행은 outbox_dead 테이블로 옮겨 뒤의 행을 막지 않게 합니다.
+#   (네트워크 오류/429/5xx 는 일시적인 오류로 보고 세지 않음)
+# - 전송에 성공하면 on_flushed(append 응답)를 호출합니다. (로컬 사본에 바로 반영하는 용도)
+# - shard_mode("month"/"year")를 주면 행의 Timestamp가 속한 기간의 샤드 탭에 씁니다. (log_shards)
+import json
+import sqlite3
+import threading
+import time
+
+from gspread.exceptions import APIError
+
+from log_shards import open_shard, row_shard_title
+from metrics import METRICS
+
+
+def _is_rejected(error):
+    # 다시 보내도 성공하지 않을 오류인지 (요청 자체가 거부됨)
+    code = getattr(error, "code", None) if isinstance(error, APIError) else None
+    return isinstance(code, int) and 400 <= code < 500 and code != 429
+
+
+class LogOutbox:
+    def __init__(self, path, file_name, tab_name, batch_size=100, interval=5.0, base_backoff=2.0,
+                 max_backoff=300.0, shard_mode=None, max_attempts=5):
+        self.path = path
+        self.file_name = file_name
+        self.tab_name = tab_name
+        self.shard_mode = shard_mode
+        self.batch_size = batch_size
+        self.interval = interval
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+
+        self.client = None
+        self.sheets = {}   # 탭 이름 -> 워크시트
+        self.on_flushed = None
+        self.last_error = None
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS outbox ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " created_at TEXT NOT NULL,"
+                " row TEXT NOT NULL,"
+                " attempts INTEGER NOT NULL DEFAULT 0)"
+            )
+            if "attempts" not in [c[1] for c in conn.execute("PRAGMA table_info(outbox)")]:
+                conn.execute("ALTER TABLE outbox ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS outbox_dead ("
+                " id INTEGER PRIMARY KEY,"
+                " created_at TEXT NOT NULL,"
+                " row TEXT NOT NULL,"
+                " error TEXT,"
+                " failed_at TEXT NOT NULL)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def bind(self, client):
+        # 인증 캐시가 새로 만들어지면 새 클라이언트로 교체합니다.
+        if client is not self.client:
+            self.client = client
+            self.sheets = {}
+            self._wake.set()
+
+    def put(self, row):
+        self.put_many([row])
+
+    def put_many(self, rows):
+        # 여러 행을 한 트랜잭션으로 넣습니다. (일괄 가져오기)
+        created_at = time.strftime("%Y-%m-%d %H:%M:%S")
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO outbox (created_at, row) VALUES (?, ?)",
+                ((created_at, json.dumps(row, ensure_ascii=False)) for row in rows),
+            )
+        self._wake.set()
+
+    def pending_count(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def dead_count(self):
+        # 시트가 계속 거부해서 보내지 않고 보관 중인 행 수
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM outbox_dead").fetchone()[0]
+
+    def _record_rejection(self, ids, error):
+        # 거부된 행의 시도 횟수를 올리고, max_attempts 번 거부된 행은 outbox_dead 로 옮깁니다.
+        marks = ", ".join("?" * len(ids))
+        failed_at = time.strftime("%Y-%m-%d %H:%M:%S")
+        with self._connect() as conn:
+            conn.execute(f"UPDATE outbox SET attempts = attempts + 1 WHERE id IN ({marks})", ids)
+            dead = conn.execute(
+                f"INSERT INTO outbox_dead (id, created_at, row, error, failed_at)"
+                f" SELECT id, created_at, row, ?, ? FROM outbox WHERE id IN ({marks}) AND attempts >= ?",
+                [f"{error}", failed_at, *ids, self.max_attempts],
+            ).rowcount
+            if dead:
+                conn.execute(f"DELETE FROM outbox WHERE id IN ({marks}) AND attempts >= ?",
+                             [*ids, self.max_attempts])
+        if dead:
+            METRICS.inc("outbox_rows_dead", dead)
+
+    def _target(self, row):
+        if self.shard_mode:
+            return row_shard_title(self.tab_name, self.shard_mode, row)
+        return self.tab_name
+
+    def _worksheet(self, title):
+        if title not in self.sheets:
+            spreadsheet = self.client.open(self.file_name)
+            if self.shard_mode:
+                self.sheets[title] = open_shard(spreadsheet, title)
+            else:
+                self.sheets[title] = spreadsheet.worksheet(title)
+        return self.sheets[title]
+
+    def flush_once(self):
+        # 가장 오래된 batch_size개를 한 번의 append_rows로 보냅니다. 보낸 행 수를 반환.
+        # (샤드 모드에서는 맨 앞 행과 같은 탭에 들어갈 행까지만 묶습니다)
+        with self._lock:
+            with self._connect() as conn:
+                batch = conn.execute(
+                    "SELECT id, row, attempts FROM outbox ORDER BY id LIMIT ?", (self.batch_size,)
+                ).fetchall()
+            if not batch:
+                return 0
+            if self.client is None:
+                raise RuntimeError("Google 인증 전입니다.")
+            if batch[0][2]:
+                batch = batch[:1]   # 거부된 적 있는 행은 혼자 보내서 뒤의 행과 분리합니다.
+            rows = [json.loads(r) for _, r, _ in batch]
+            title = self._target(rows[0])
+            n = next((i for i, row in enumerate(rows) if self._target(row) != title), len(rows))
+            batch, rows = batch[:n], rows[:n]
+            sheet = self._worksheet(title)
+            try:
+                with METRICS.span("sheets.append_rows"):
+                    response = sheet.append_rows(rows, include_values_in_response=True)
+            except Exception as e:
+                if _is_rejected(e):
+                    self._record_rejection([i for i, _, _ in batch], e)
+                raise
+            METRICS.inc("outbox_rows_sent", len(batch))
+            with self._connect() as conn:
+                conn.execute("DELETE FROM outbox WHERE id <= ?", (batch[-1][0],))
+            if self.on_flushed:
+                try:
+                    self.on_flushed(response)
+                except Exception:
+                    pass   # 이미 시트에 저장된 행이므로 다시 보내지 않습니다. (다음 동기화 때 반영)
+            return len(batch)
+
+    def flush(self):
+        total = 0
+        while True:
+            n = self.flush_once()
+            if n == 0:
+                return total
+            total += n
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="log-outbox", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        backoff = 0.0
+        while True:
+            if backoff:
+                # 백오프 중에는 새 행이 들어와도 기다립니다. (API 할당량 보호)
+                time.sleep(backoff)
+            else:
+                self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+                self.last_error = None
+                backoff = 0.0
+            except Exception as e:
+                self.last_error = f"{e}"
+                self.sheets = {}
+                backoff = min(self.max_backoff, max(self.base_backoff, backoff * 2))
@@ -0,0 +1,139 @@
+# 세포주(Cell_Name) x 계대 배수(Passage_No)별 요약 (로컬 사본의 rollup 테이블)
+# - 새 행이 들어올 때마다 그 행들의 통계만 구해서 기존 요약과 합칩니다. (전체를 다시 읽지 않음)
+#   생존률 평균/분산은 (개수, 평균, 편차 제곱합)으로 보관하고 Chan 의 병합식으로 합칩니다.
+# - 배가 시간(doubling time)은 연속된 두 계대 사이에서 어림합니다.
+#   계대 p 의 마지막 기록에서 접시당 심은 세포 수(Target_Cells_per_Dish)가
+#   계대 p+1 의 첫 기록의 총 세포 수(Total_Live_Cells_in_Tube)까지 자라는 데 걸린 시간 기준
+#   (한 접시를 수확해서 계수한다고 가정합니다)
+import numpy as np
+import pandas as pd
+
+KEYS = ["cell_name", "passage_no"]
+ROLLUP_COLUMNS = {
+    "cell_name": "TEXT NOT NULL",
+    "passage_no": "INTEGER NOT NULL",
+    "n": "INTEGER",               # 기록 수
+    "n_viability": "INTEGER",
+    "viability_mean": "REAL",
+    "viability_m2": "REAL",       # 편차 제곱합 (분산 = m2 / (n_viability - 1))
+    "n_live": "INTEGER",
+    "live_sum": "REAL",           # 총 세포 수(Live) 합계
+    "first_ts": "TEXT",
+    "first_live": "REAL",
+    "last_ts": "TEXT",
+    "last_viability": "REAL",
+    "last_target": "REAL",
+}
+
+CREATE_SQL = (
+    "CREATE TABLE rollup ("
+    + ", ".join(f"{c} {t}" for c, t in ROLLUP_COLUMNS.items())
+    + ", PRIMARY KEY (cell_name, passage_no)) WITHOUT ROWID"
+)
+
+
+def batch_stats(df):
+    # 정규화된 로그 행(숫자 변환, Timestamp 문자열)에서 키별 통계를 구합니다.
+    if "Cell_Name" not in df.columns or "Passage_No" not in df.columns:
+        return pd.DataFrame(columns=list(ROLLUP_COLUMNS))
+
+    def column(name):
+        if name not in df.columns:
+            return pd.Series(np.nan, index=df.index)
+        return df[name] if name == "Timestamp" else pd.to_numeric(df[name], errors="coerce")
+
+    d = pd.DataFrame({
+        "cell_name": df["Cell_Name"],
+        "passage_no": column("Passage_No"),
+        "ts": column("Timestamp"),
+        "viability": column("Viability_Percent"),
+        "live": column("Total_Live_Cells_in_Tube"),
+        "target": column("Target_Cells_per_Dish"),
+    }).dropna(subset=["cell_name", "passage_no"])
+    d = d[d["cell_name"].astype(str).str.strip() != ""]
+    if d.empty:
+        return pd.DataFrame(columns=list(ROLLUP_COLUMNS))
+    d["cell_name"] = d["cell_name"].astype(str)
+    d["passage_no"] = d["passage_no"].astype("int64")
+    d["ts"] = d["ts"].fillna("").astype(str)
+    d = d.sort_values("ts", kind="stable")   # 같은 시각이면 나중에 들어온 행이 마지막
+
+    g = d.groupby(KEYS, sort=False)
+    out = g.agg(n=("ts", "size"), n_viability=("viability", "count"),
+                viability_mean=("viability", "mean"), n_live=("live", "count"),
+                live_sum=("live", "sum"), first_ts=("ts", "first"), last_ts=("ts", "last"))
+    out["viability_m2"] = (g["viability"].var(ddof=0) * out["n_viability"]).fillna(0.0)
+    firsts = d.drop_duplicates(KEYS, keep="first").set_index(KEYS)
+    lasts = d.drop_duplicates(KEYS, keep="last").set_index(KEYS)
+    out["first_live"] = firsts["live"]
+    out["last_viability"] = lasts["viability"]
+    out["last_target"] = lasts["target"]
+    return out.reset_index()[list(ROLLUP_COLUMNS)]
+
+
+def merge(old, new):
+    # 같은 키의 기존 요약(old)과 새 행들의 요약(new)을 합칩니다. new 의 키마다 한 행을 돌려줍니다.
+    if old.empty:
+        return new
+    m = new.merge(old, on=KEYS, how="left", suffixes=("", "_old"))
+    has_old = m["n_old"].notna()
+    na = m["n_viability_old"].fillna(0)
+    nb = m["n_viability"]
+    n_v = na + nb
+    delta = m["viability_mean"] - m["viability_mean_old"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(na == 0, m["viability_mean"],
+                        np.where(nb == 0, m["viability_mean_old"],
+                                 m["viability_mean_old"] + delta * nb / n_v))
+        m2 = (m["viability_m2_old"].fillna(0) + m["viability_m2"]
+              + np.where((na > 0) & (nb > 0), delta ** 2 * na * nb / n_v, 0.0))
+
+    first_new = ~has_old | (m["first_ts"] < m["first_ts_old"])
+    last_new = ~has_old | (m["last_ts"] >= m["last_ts_old"])
+    out = pd.DataFrame({
+        "cell_name": m["cell_name"],
+        "passage_no": m["passage_no"],
+        "n": m["n"] + m["n_old"].fillna(0),
+        "n_viability": n_v,
+        "viability_mean": mean,
+        "viability_m2": m2,
+        "n_live": m["n_live"] + m["n_live_old"].fillna(0),
+        "live_sum": m["live_sum"] + m["live_sum_old"].fillna(0),
+        "first_ts": m["first_ts"].where(first_new, m["first_ts_old"]),
+        "first_live": m["first_live"].where(first_new, m["first_live_old"]),
+        "last_ts": m["last_ts"].where(last_new, m["last_ts_old"]),
+        "last_viability": m["last_viability"].where(last_new, m["last_viability_old"]),
+        "last_target": m["last_target"].where(last_new, m["last_target_old"]),
+    })
+    return out.astype({"n": "int64", "n_viability": "int64", "n_live": "int64"})
+
+
+def summarize(rollup):
+    # rollup 테이블 -> 화면용 표 (계대별 생존률 평균/표준편차, 평균 수율, 배가 시간)
+    if rollup.empty:
+        return pd.DataFrame(columns=["Cell_Name", "Passage_No", "Records", "Latest_Viability",
+                                     "Viability_Mean", "Viability_Std", "Mean_Live_Cells",
+                                     "Doubling_Time_h", "Last_Timestamp"])
+    r = rollup.sort_values(KEYS).reset_index(drop=True)
+    prev = r.groupby("cell_name")[["passage_no", "last_ts", "last_target"]].shift()
+    consecutive = r["passage_no"] == prev["passage_no"] + 1
+    hours = (pd.to_datetime(r["first_ts"], errors="coerce")
+             - pd.to_datetime(prev["last_ts"], errors="coerce")).dt.total_seconds() / 3600
+    with np.errstate(invalid="ignore", divide="ignore"):
+        fold = np.log2(r["first_live"] / prev["last_target"])
+        doubling = hours / fold
+    doubling = doubling.where(consecutive & (hours > 0) & (fold > 0))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        std = np.sqrt(r["viability_m2"] / (r["n_viability"] - 1)).where(r["n_viability"] > 1)
+        mean_live = (r["live_sum"] / r["n_live"]).where(r["n_live"] > 0)
+    return pd.DataFrame({
+        "Cell_Name": r["cell_name"],
+        "Passage_No": r["passage_no"],
+        "Records": r["n"],
+        "Latest_Viability": r["last_viability"],
+        "Viability_Mean": r["viability_mean"],
+        "Viability_Std": std,
+        "Mean_Live_Cells": mean_live,
+        "Doubling_Time_h": doubling,
+        "Last_Timestamp": r["last_ts"],
+    })
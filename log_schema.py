@@ -0,0 +1,102 @@
+# 배양 일지 'Log' 워크시트의 컬럼 스키마
+# - 계산기가 저장하는 16개 컬럼의 순서와 자료형을 한곳에 정의합니다.
+# - 숫자 컬럼 중 일부는 f"{...:.2e}" 같은 문자열로 저장되므로 읽을 때 한 번에 변환합니다.
+import pandas as pd
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# 컬럼 이름 -> pandas 자료형 (시트에 저장되는 순서)
+LOG_SCHEMA = {
+    "Timestamp": "datetime64[ns]",
+    "Cell_Name": "category",
+    "Passage_No": "Int32",
+    "Operators": "category",
+    "Notes": "string",
+    "Viability_Percent": "float32",
+    "Counted_Total_Live": "Int32",
+    "Counted_Total_Dead": "Int32",
+    "Stock_Concentration_cells_ml": "float32",
+    "Total_Live_Cells_in_Tube": "float32",
+    "Stock_Volume_ml": "float32",
+    "Target_Cells_per_Dish": "float32",
+    "Seeding_Volume_per_Dish_ml": "float32",
+    "Media_to_Add_ml": "float32",
+    "Total_Final_Volume_ml": "float32",
+    "Total_Dishes_Made": "Int32",
+}
+LOG_COLUMNS = list(LOG_SCHEMA)
+
+# 시트에 문자열로 저장하는 숫자 컬럼의 형식 (계산기 저장 폼과 일괄 가져오기가 같이 씀)
+LOG_FORMATS = {
+    "Viability_Percent": ".2f",
+    "Stock_Concentration_cells_ml": ".2e",
+    "Total_Live_Cells_in_Tube": ".2e",
+    "Target_Cells_per_Dish": ".2e",
+    "Media_to_Add_ml": ".3f",
+    "Total_Final_Volume_ml": ".3f",
+}
+
+
+def is_numeric(column):
+    return LOG_SCHEMA.get(column, "").lower().startswith(("int", "float"))
+
+
+def sqlite_type(column):
+    dtype = LOG_SCHEMA.get(column, "")
+    if dtype.lower().startswith("int"):
+        return "INTEGER"
+    if dtype.startswith("float"):
+        return "REAL"
+    return "TEXT"
+
+
+def format_value(column, value):
+    # 시트에 쓸 값 하나 (빈 값은 빈 문자열)
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ""
+    if column in LOG_FORMATS:
+        return format(float(value), LOG_FORMATS[column])
+    dtype = LOG_SCHEMA.get(column, "")
+    if dtype.lower().startswith("int"):
+        return int(value)
+    if dtype.startswith("float"):
+        return float(value)
+    return value
+
+
+def format_log_row(values):
+    # 컬럼 이름 -> 값 dict 를 시트에 추가할 한 행(LOG_COLUMNS 순서)으로 만듭니다.
+    return [format_value(c, values.get(c)) for c in LOG_COLUMNS]
+
+
+def parse_timestamps(values):
+    # TIMESTAMP_FORMAT 으로 먼저 읽고, 형식이 다른 값이 섞여 있으면 형식 추론으로 한 번 더 시도합니다.
+    # 끝내 읽을 수 없는 값(빈 칸 포함)은 NaT
+    parsed = pd.to_datetime(values, format=TIMESTAMP_FORMAT, errors="coerce")
+    if parsed.isna().any():
+        parsed = parsed.fillna(pd.to_datetime(values[parsed.isna()], errors="coerce", format="mixed"))
+    return parsed
+
+
+def _convert(values, dtype):
+    if dtype.startswith("datetime"):
+        return parse_timestamps(values).astype(dtype)
+    if dtype.lower().startswith("int"):
+        # 소수점 값(예: "3.0")도 받아들이되, 정수가 아니면 결측으로 둡니다.
+        numbers = pd.to_numeric(values, errors="coerce")
+        numbers = numbers.where(numbers.round() == numbers)
+        return numbers.astype(dtype)
+    if dtype.startswith("float"):
+        return pd.to_numeric(values, errors="coerce").astype(dtype)
+    if dtype == "category":
+        return values.where(values.isna(), values.astype(str)).astype("category")
+    return values.astype(dtype)
+
+
+def apply_schema(df):
+    # 스키마에 있는 컬럼을 한 번씩만 변환해서 새 DataFrame을 만듭니다. (중간 복사본 없음)
+    # 스키마에 없는 컬럼은 그대로 둡니다.
+    return pd.DataFrame(
+        {c: _convert(df[c], LOG_SCHEMA[c]) if c in LOG_SCHEMA else df[c] for c in df.columns},
+        index=df.index,
+    )
@@ -0,0 +1,219 @@
+# 기간별로 나눈 일지 워크시트 (샤드)
+# - 'Log' 탭 하나 대신 'Log_2025-03'(월 단위) 또는 'Log_2025'(연 단위) 탭에 나눠 저장합니다.
+#   새 행은 행의 Timestamp가 속한 기간의 탭에 추가하고, 탭이 없으면 헤더와 함께 만듭니다.
+# - ShardedLogMirror 는 모든 샤드를 로컬 SQLite 사본 하나에 모읍니다.
+#   row_no = 샤드 번호(기간 YYYYMM / YYYY, 기존 'Log' 탭은 0) * SHARD_ROWS + 시트 행 번호
+#   이므로 row_no 순서가 곧 기간 순서입니다.
+# - 지난 기간의 샤드는 기간이 끝난 뒤 시작한 동기화로 한 번 더 읽으면 닫고(closed), 그 뒤로는
+#   다시 읽지 않습니다. 현재 기간의 샤드와 아직 닫히지 않은 샤드만 증분 동기화합니다.
+#   닫힌 샤드에 앱이 쓴 행을 바로 반영하지 못하면 샤드를 다시 열어 다음 동기화에서 읽습니다.
+#   처음 읽을 때는 여러 샤드를 스레드 풀로 동시에 가져옵니다.
+import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from gspread.exceptions import WorksheetNotFound
+
+from log_mirror import LogMirror, _sql_columns
+from log_schema import LOG_COLUMNS, TIMESTAMP_FORMAT
+from sheet_log import LogSync
+
+SHARD_FORMATS = {"month": "%Y-%m", "year": "%Y"}
+SHARD_PATTERNS = {"month": r"\d{4}-\d{2}", "year": r"\d{4}"}
+SHARD_ROWS = 10_000_000   # 시트 한 개의 최대 행 수보다 큰 값 (샤드별 row_no 구간 크기)
+MAX_WORKERS = 4
+
+
+def shard_title(base_title, mode, when=None):
+    return f"{base_title}_{(when or datetime.now()).strftime(SHARD_FORMATS[mode])}"
+
+
+def row_shard_title(base_title, mode, row):
+    # 일지 한 행(log_data_list)이 들어갈 샤드 탭 이름 (Timestamp를 읽을 수 없으면 현재 기간)
+    try:
+        when = datetime.strptime(str(row[0]), TIMESTAMP_FORMAT)
+    except (IndexError, ValueError):
+        when = None
+    return shard_title(base_title, mode, when)
+
+
+def shard_ordinal(base_title, mode, title):
+    # 샤드 탭이면 번호(기존 탭은 0), 아니면 None
+    if title == base_title:
+        return 0
+    match = re.fullmatch(re.escape(base_title) + "_(" + SHARD_PATTERNS[mode] + ")", title)
+    return int(match.group(1).replace("-", "")) if match else None
+
+
+def open_shard(spreadsheet, title, header=None):
+    # 샤드 탭을 열고, 없으면 헤더 행과 함께 만듭니다.
+    try:
+        return spreadsheet.worksheet(title)
+    except WorksheetNotFound:
+        header = list(header or LOG_COLUMNS)
+        sheet = spreadsheet.add_worksheet(title=title, rows=1000, cols=len(header))
+        sheet.append_rows([header])
+        return sheet
+
+
+class ShardSync(LogSync):
+    # 샤드 워크시트 한 개의 동기화 상태. 행은 ShardedLogMirror 의 log 테이블에 저장합니다.
+    def __init__(self, mirror, title, ordinal):
+        super().__init__()
+        self.mirror = mirror
+        self.title = title
+        self.base = ordinal * SHARD_ROWS
+        self.closed = False   # 기간이 끝난 뒤에 끝까지 읽었으면 True (더 이상 읽지 않음)
+
+    def _replace(self, rows):
+        self.mirror._replace_shard(self, rows)
+
+    def _append(self, rows):
+        self.mirror._append_shard(self, rows)
+
+    def _save_state(self):
+        self.mirror._save_shard_state(self)
+
+    def state(self):
+        return {"header": self.header, "n_rows": self.n_rows, "last_raw": self.last_raw,
+                "version": self.version, "closed": self.closed}
+
+
+class ShardedLogMirror(LogMirror):
+    def __init__(self, path, base_title, mode):
+        super().__init__(path)
+        self.base_title = base_title
+        self.mode = mode
+        self.shards = {}
+        self.write_lock = threading.Lock()   # 샤드를 동시에 동기화해도 SQLite 쓰기는 하나씩
+        with self._connect() as conn:
+            saved = conn.execute("SELECT key, value FROM meta WHERE key LIKE 'shard:%'").fetchall()
+        if self.header is None:
+            saved = []   # 사본 구조가 바뀌었으면 모든 샤드를 다시 읽습니다.
+        for key, value in saved:
+            title = key[len("shard:"):]
+            ordinal = shard_ordinal(base_title, mode, title)
+            if ordinal is None:
+                continue
+            shard = ShardSync(self, title, ordinal)
+            for k, v in json.loads(value).items():
+                setattr(shard, k, v)
+            self.shards[title] = shard
+
+    def is_past(self, title):
+        # 기간이 끝난 샤드인지 (기존 'Log' 탭 포함, 현재 기간의 샤드가 아닌 나머지)
+        return title != shard_title(self.base_title, self.mode)
+
+    # --- 동기화 ---
+    def sync_shards(self, spreadsheet, refresh_closed=False, full=False, max_workers=MAX_WORKERS):
+        # 워크시트 목록을 한 번 읽고, 아직 읽지 않은 샤드와 현재 샤드만 동시에 동기화합니다.
+        # full=True 면 닫힌 샤드를 포함한 모든 샤드를 처음부터 다시 읽습니다.
+        # 시트에서 사라진 샤드는 로컬 사본에서도 지웁니다. 데이터가 바뀌었으면 True를 반환합니다.
+        sheets = {}
+        for sheet in spreadsheet.worksheets():
+            ordinal = shard_ordinal(self.base_title, self.mode, sheet.title)
+            if ordinal is not None:
+                sheets[sheet.title] = (sheet, ordinal)
+
+        changed = False
+        for title in [t for t in self.shards if t not in sheets]:
+            self._drop_shard(self.shards.pop(title))
+            changed = True
+
+        jobs = []
+        for title, (sheet, ordinal) in sorted(sheets.items(), key=lambda kv: kv[1][1]):
+            shard = self.shards.setdefault(title, ShardSync(self, title, ordinal))
+            if shard.header and shard.closed and not (refresh_closed or full):
+                continue   # 닫힌 샤드는 로컬 사본을 그대로 씁니다.
+            jobs.append((shard, sheet, self.is_past(title), full))   # 기간이 끝났는지는 동기화 시작 시점 기준
+        if jobs:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(jobs))) as pool:
+                changed = any(list(pool.map(lambda job: self._sync_shard(*job), jobs))) or changed
+        return changed
+
+    def _sync_shard(self, shard, sheet, past, full=False):
+        changed = shard.sync(sheet, full)
+        if past and not shard.closed:
+            # 기간이 끝난 뒤에 시작한 동기화로 마지막 행까지 읽었으므로 닫습니다.
+            shard.closed = True
+            self._save_shard_state(shard, changed=False)
+        return changed
+
+    def apply_append(self, response):
+        # 응답 범위의 탭 이름으로 샤드를 찾아 그 샤드에 반영합니다.
+        data = (response or {}).get("updates", {})
+        updated_range = data.get("updatedData", {}).get("range") or data.get("updatedRange") or ""
+        title = updated_range.rsplit("!", 1)[0].strip("'").replace("''", "'")
+        shard = self.shards.get(title)
+        if shard is None:
+            return False   # 아직 읽지 않은 샤드 (다음 동기화에서 처음부터 읽음)
+        if shard.apply_append(response):
+            return True
+        if shard.closed:
+            # 지난 기간의 샤드에 쓴 행(예: 예전 날짜의 일괄 가져오기)을 반영하지 못했으면 다시 엽니다.
+            shard.closed = False
+            self._save_shard_state(shard, changed=False)
+        return False
+
+    # --- ShardSync 보관 방식 ---
+    def _ensure_table(self, header):
+        if not self.columns:
+            self.header = list(header)
+            LogMirror._replace(self, [])
+
+    def _align(self, shard, rows):
+        # 샤드마다 헤더 순서가 다를 수 있으므로 (기존 'Log' 탭 등) 컬럼 이름으로 사본 테이블에 맞춥니다.
+        # 사본에 없는 컬럼은 버리고, 샤드에 없는 컬럼은 빈 값으로 둡니다.
+        names = _sql_columns(shard.header)
+        if names == self.columns:
+            return rows
+        index = {name: i for i, name in enumerate(names)}
+        picks = [index.get(c) for c in self.columns]
+        return [[row[i] if i is not None and i < len(row) else "" for i in picks] for row in rows]
+
+    def _replace_shard(self, shard, rows):
+        with self.write_lock:
+            self._ensure_table(shard.header)
+            with self._connect() as conn:
+                deleted = self._delete_range(conn, shard)
+                self._insert(conn, self._align(shard, rows), shard.base)
+                if deleted:
+                    self._rebuild_rollup(conn)
+
+    def _append_shard(self, shard, rows):
+        with self.write_lock:
+            self._ensure_table(shard.header)
+            with self._connect() as conn:
+                self._insert(conn, self._align(shard, rows), shard.base + shard.n_rows)
+
+    def _delete_range(self, conn, shard):
+        # 샤드의 행을 지우고, 지운 행 수를 반환합니다.
+        if not self.columns:
+            return 0
+        bounds = (shard.base + 1, shard.base + SHARD_ROWS)
+        deleted = conn.execute("DELETE FROM log WHERE row_no BETWEEN ? AND ?", bounds).rowcount
+        conn.execute("DELETE FROM log_operator WHERE row_no BETWEEN ? AND ?", bounds)
+        return deleted
+
+    def _drop_shard(self, shard):
+        with self.write_lock:
+            with self._connect() as conn:
+                if self._delete_range(conn, shard):
+                    self._rebuild_rollup(conn)
+                conn.execute("DELETE FROM meta WHERE key = ?", (f"shard:{shard.title}",))
+            self.version += 1
+            self.n_rows = sum(s.n_rows for s in self.shards.values())   # 지운 샤드는 이미 빠져 있음
+            self._save_state()
+
+    def _save_shard_state(self, shard, changed=True):
+        # 샤드의 데이터가 바뀌면 전체 사본의 데이터 버전도 올립니다.
+        with self.write_lock:
+            if changed:
+                self.version += 1
+            self.n_rows = sum(s.n_rows for s in self.shards.values())
+            items = self._meta_items()
+            items.append((f"shard:{shard.title}", json.dumps(shard.state(), ensure_ascii=False)))
+            with self._connect() as conn:
+                conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", items)
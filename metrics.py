@@ -0,0 +1,167 @@
+# 실행 구간별 소요 시간과 카운터 (성능 디버그 패널 / 모니터링용 파일)
+# - span(이름): 구간 시간을 재서 누적 통계(횟수/합계/최대)와 현재 실행의 구간 목록에 기록합니다.
+# - inc(이름): 캐시 적중/실패, Sheets API 호출 수/바이트 같은 카운터를 올립니다.
+# - 현재 실행의 구간 목록은 스레드별로 따로 모읍니다. (Streamlit 은 세션마다 다른 스레드에서 실행)
+# - write_jsonl / write_prometheus 로 파일에 내보내면 모니터링 도구가 읽어 갈 수 있습니다.
+#   export() 는 실행 기록을 모아 두었다가 EXPORT_INTERVAL 초에 한 번만 파일에 씁니다.
+#   (계산기 입력 하나하나마다 파일을 다시 쓰지 않도록. 프로세스가 끝나면 마지막 몇 초의 기록은 빠질 수 있음)
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+PROMETHEUS_PREFIX = "cellcounter"
+JSONL_MAX_BYTES = 10 * 1024 * 1024   # 넘으면 .1 로 옮기고 새로 씁니다.
+EXPORT_INTERVAL = 10.0               # export() 가 파일을 쓰는 최소 간격 (초)
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = Counter()
+        self.timings = {}   # 이름 -> [횟수, 합계(초), 최대(초)]
+        self._local = threading.local()
+        self._pending = []          # 아직 파일에 쓰지 않은 실행 기록
+        self._last_export = 0.0
+        self._export_lock = threading.Lock()
+
+    # --- 기록 ---
+    @contextmanager
+    def span(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0)
+
+    def observe(self, name, seconds):
+        with self.lock:
+            stat = self.timings.setdefault(name, [0, 0.0, 0.0])
+            stat[0] += 1
+            stat[1] += seconds
+            stat[2] = max(stat[2], seconds)
+        run = getattr(self._local, "run", None)
+        if run is not None:
+            run["spans"].append((name, seconds))
+
+    def inc(self, name, n=1):
+        with self.lock:
+            self.counters[name] += n
+        run = getattr(self._local, "run", None)
+        if run is not None:
+            run["counters"][name] += n
+
+    # --- 실행 단위 (Streamlit 재실행 한 번, 또는 fragment 하나만 다시 실행) ---
+    def begin_run(self, scope="app"):
+        self._local.run = {"scope": scope, "started": time.time(), "t0": time.perf_counter(),
+                           "spans": [], "counters": Counter()}
+
+    def end_run(self):
+        # 현재 실행의 기록을 dict 로 돌려주고 초기화합니다.
+        run = getattr(self._local, "run", None)
+        self._local.run = None
+        if run is None:
+            return None
+        total = time.perf_counter() - run["t0"]
+        self.observe(f"rerun.{run['scope']}", total)
+        return {
+            "scope": run["scope"],
+            "ts": run["started"],
+            "total_s": total,
+            "spans": [{"name": n, "seconds": s} for n, s in run["spans"]],
+            "counters": dict(run["counters"]),
+        }
+
+    @contextmanager
+    def run(self, scope, on_end=None):
+        # fragment 본문용: 전체 실행 안에서 불리면 구간 하나로, 혼자 다시 실행되면 실행 하나로 기록합니다.
+        # (데코레이터로도 쓸 수 있습니다)
+        if getattr(self._local, "run", None) is not None:
+            with self.span(scope):
+                yield
+            return
+        self.begin_run(scope)
+        try:
+            yield
+        finally:
+            record = self.end_run()
+            if on_end is not None:
+                on_end(record)
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.counters), {k: list(v) for k, v in self.timings.items()}
+
+    # --- 내보내기 ---
+    def write_jsonl(self, path, *records):
+        if os.path.exists(path) and os.path.getsize(path) > JSONL_MAX_BYTES:
+            os.replace(path, path + ".1")
+        with open(path, "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+
+    def export(self, jsonl_path, prom_path, record, interval=EXPORT_INTERVAL):
+        # 실행 기록을 모아 두고, 마지막으로 쓴 지 interval 초가 지났을 때만 두 파일을 씁니다.
+        now = time.monotonic()
+        with self.lock:
+            self._pending.append(record)
+            if now - self._last_export < interval:
+                return False
+            self._last_export = now
+            records, self._pending = self._pending, []
+        with self._export_lock:   # 여러 세션이 동시에 내보내도 파일은 하나씩
+            self.write_jsonl(jsonl_path, *records)
+            self.write_prometheus(prom_path)
+        return True
+
+    def prometheus_text(self):
+        counters, timings = self.snapshot()
+        lines = [
+            f"# TYPE {PROMETHEUS_PREFIX}_span_seconds summary",
+        ]
+        for name, (count, total, _) in sorted(timings.items()):
+            lines.append(f'{PROMETHEUS_PREFIX}_span_seconds_count{{span="{name}"}} {count}')
+            lines.append(f'{PROMETHEUS_PREFIX}_span_seconds_sum{{span="{name}"}} {total:.6f}')
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}_span_seconds_max gauge")
+        for name, (_, _, worst) in sorted(timings.items()):
+            lines.append(f'{PROMETHEUS_PREFIX}_span_seconds_max{{span="{name}"}} {worst:.6f}')
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}_events_total counter")
+        for name, value in sorted(counters.items()):
+            lines.append(f'{PROMETHEUS_PREFIX}_events_total{{name="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        # 읽는 쪽이 쓰다 만 파일을 보지 않도록 같은 폴더의 임시 파일에 쓰고 바꿔치기합니다.
+        # (임시 파일 이름은 호출마다 다르므로 여러 세션이 동시에 써도 서로 덮어쓰지 않음)
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=os.path.dirname(os.path.abspath(path)),
+                                         prefix=os.path.basename(path) + ".", suffix=".tmp",
+                                         delete=False) as f:
+            f.write(self.prometheus_text())
+        try:
+            os.replace(f.name, path)
+        except OSError:
+            os.unlink(f.name)
+            raise
+
+
+METRICS = Metrics()
+
+
+def instrument_gspread(client, metrics=METRICS):
+    # gspread 클라이언트의 HTTP 세션에 응답 훅을 달아 Sheets API 호출 수/바이트를 셉니다.
+    session = getattr(getattr(client, "http_client", None), "session", None)
+    if session is None or getattr(session, "_cellcounter_instrumented", False):
+        return
+
+    def on_response(response, *args, **kwargs):
+        metrics.inc("sheets_api_calls")
+        metrics.inc("sheets_api_bytes", len(response.content or b""))
+        if response.status_code == 429:
+            metrics.inc("sheets_api_rate_limited")
+        elif response.status_code >= 400:
+            metrics.inc("sheets_api_errors")
+
+    session.hooks.setdefault("response", []).append(on_response)
+    session._cellcounter_instrumented = True
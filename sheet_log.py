@@ -0,0 +1,105 @@
+# Google Sheets 'Log' 워크시트 입출력
+# - 증분 동기화: 마지막으로 읽은 행 이후의 새 행만 범위 읽기로 가져옵니다.
+# - 앱이 직접 추가한 행은 append 응답으로 바로 반영해서 다시 읽지 않습니다. (apply_append)
+# - LogSync 는 동기화 상태만 다루는 기반 클래스입니다. 읽은 행을 어디에 보관할지는 하위 클래스가
+#   _replace / _append / _save_state 를 구현해서 정합니다. (log_mirror.LogMirror: 로컬 SQLite)
+import threading
+
+from gspread.utils import a1_range_to_grid_range, rowcol_to_a1
+
+
+def _col_letter(n_cols):
+    return rowcol_to_a1(1, max(n_cols, 1)).rstrip("0123456789")
+
+
+def _pad(row, width):
+    # Sheets API는 행 끝의 빈 셀을 잘라서 돌려주므로 헤더 길이에 맞춰 채웁니다.
+    row = list(row[:width])
+    return row + [""] * (width - len(row))
+
+
+class LogSync:
+    # 워크시트 한 개의 동기화 상태 (헤더, 읽은 행 수, 마지막 행)
+    def __init__(self):
+        self.header = None
+        self.n_rows = 0
+        self.last_raw = None   # 마지막으로 읽은 행의 원본 값 (일관성 확인용)
+        self.version = 0       # 데이터가 바뀔 때마다 1씩 증가
+        self.lock = threading.Lock()
+
+    # --- 보관 방식 (하위 클래스에서 구현) ---
+    def _replace(self, rows):
+        # 보관한 행을 모두 rows 로 바꿉니다. (전체 재동기화)
+        raise NotImplementedError
+
+    def _append(self, rows):
+        # 보관한 행 뒤에 rows 를 추가합니다.
+        raise NotImplementedError
+
+    def _save_state(self):
+        # 헤더/행 수 등 동기화 상태를 저장합니다.
+        raise NotImplementedError
+
+    # --- 동기화 ---
+    def full_sync(self, sheet):
+        values = sheet.get_all_values()
+        self.header = list(values[0]) if values else []
+        rows = values[1:]
+        self._replace(rows)
+        self.n_rows = len(rows)
+        self.last_raw = _pad(rows[-1] if rows else self.header, len(self.header))
+        self.version += 1
+        self._save_state()
+        return True
+
+    def sync(self, sheet, full=False):
+        # 한 번의 batch_get으로 (헤더, 마지막으로 읽은 행, 그 이후의 새 행)을 확인합니다.
+        # 헤더나 마지막 행이 달라졌다면 (행 삭제/수정/정렬) 전체 재동기화합니다.
+        # 행 수가 같은 중간 행 수정/삭제+추가는 알 수 없으므로 full=True 로 전체를 다시 읽습니다. (새로고침 버튼)
+        # 데이터가 바뀌었으면 True를 반환합니다.
+        with self.lock:
+            if full or not self.header:
+                return self.full_sync(sheet)
+
+            width = len(self.header)
+            last_col = _col_letter(width)
+            last_row_no = self.n_rows + 1   # 1행은 헤더
+            header_vr, last_vr, new_vr = sheet.batch_get([
+                "1:1",
+                f"A{last_row_no}:{last_col}{last_row_no}",
+                f"A{last_row_no + 1}:{last_col}",
+            ])
+
+            header = list(header_vr[0]) if header_vr else []
+            last_raw = _pad(last_vr[0] if last_vr else [], width)
+            if (len(header) > width or _pad(header, width) != self.header
+                    or last_raw != self.last_raw):
+                return self.full_sync(sheet)
+
+            return self._add_rows(list(new_vr))
+
+    def _add_rows(self, new_rows):
+        if not new_rows:
+            return False
+        self._append(new_rows)
+        self.n_rows += len(new_rows)
+        self.last_raw = _pad(new_rows[-1], len(self.header))
+        self.version += 1
+        self._save_state()
+        return True
+
+    def apply_append(self, response):
+        # append_rows(..., include_values_in_response=True) 의 응답으로 방금 쓴 행을 반영합니다.
+        # 읽어 둔 마지막 행 바로 다음에 추가된 경우에만 반영하고, 아니면 (다른 사람이 먼저 썼거나
+        # 아직 한 번도 읽지 않음) 다음 sync()에 맡깁니다. 반영했으면 True를 반환합니다.
+        updates = (response or {}).get("updates", {})
+        data = updates.get("updatedData", {})
+        rows = data.get("values")
+        updated_range = data.get("range") or updates.get("updatedRange")
+        if not rows or not updated_range:
+            return False
+        start_row = a1_range_to_grid_range(updated_range.split("!")[-1]).get("startRowIndex", 0) + 1
+        with self.lock:
+            if not self.header or start_row != self.n_rows + 2:   # 1행은 헤더
+                return False
+            return self._add_rows([[str(v) for v in r] for r in rows])